@@ -48,6 +48,7 @@ gcloud run deploy "$SERVICE_NAME" \
     --memory 1Gi \
     --cpu 2 \
     --timeout 300 \
+    --concurrency 32 \
     --max-instances 10 \
     --min-instances 0
 
@@ -25,13 +25,14 @@ load_dotenv()
 sys.path.insert(0, str(Path(__file__).parent))
 
 from parsers.compare_estimate_to_actual import (
-    load_excel,
+    load_excel_pair,
     compare_estimates,
     generate_summary_stats
 )
 from report.generate_summary import (
     initialize_vertex_ai,
     generate_insight_narrative,
+    format_variance_table,
     generate_quick_summary
 )
 from memory.store_project_summary import store_project_insight, retrieve_similar_projects
@@ -69,14 +70,12 @@ def main():
     print("=" * 80)
     print()
     
-    # Step 1: Load Excel files
+    # Step 1: Load Excel files (both at once)
     print(f"📊 Loading estimate file: {args.estimate_file}")
-    estimate_df = load_excel(args.estimate_file)
-    print(f"   ✓ Loaded {len(estimate_df)} rows")
-    
     print(f"📊 Loading actual file: {args.actual_file}")
-    actual_df = load_excel(args.actual_file)
-    print(f"   ✓ Loaded {len(actual_df)} rows")
+    estimate_df, actual_df = load_excel_pair(args.estimate_file, args.actual_file)
+    print(f"   ✓ Loaded {len(estimate_df)} estimate rows")
+    print(f"   ✓ Loaded {len(actual_df)} actual rows")
     print()
     
     # Step 2: Compare and calculate variance
@@ -128,7 +127,7 @@ def main():
         print("🤖 Generating AI insight with Gemini 1.5 Pro...")
         try:
             initialize_vertex_ai()
-            variance_data_str = variance_df.to_string(index=False)
+            variance_data_str = format_variance_table(variance_df)
             narrative = generate_insight_narrative(
                 variance_data_str,
                 summary_stats,
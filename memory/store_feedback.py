@@ -7,15 +7,24 @@ This module stores feedback on:
 """
 
 import os
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from google.cloud import firestore
 
 
+# Firestore clients reused across calls, keyed by project ID
+_clients: Dict[str, firestore.Client] = {}
+_clients_lock = threading.Lock()
+
+
 def initialize_firestore(project_id: str = None) -> firestore.Client:
     """
     Initialize Firestore client.
     
+    The client (gRPC channel + credentials) is created once per project and
+    reused by every later call.
+    
     Args:
         project_id: GCP project ID (defaults to env var GCP_PROJECT_ID)
     
@@ -28,7 +37,18 @@ def initialize_firestore(project_id: str = None) -> firestore.Client:
     if not project_id:
         raise ValueError("GCP_PROJECT_ID must be set in environment or passed as argument")
     
-    return firestore.Client(project=project_id)
+    client = _clients.get(project_id)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(project_id)
+            if client is None:
+                client = firestore.Client(project=project_id)
+                _clients[project_id] = client
+    return client
+
+
+# Firestore commits at most 500 writes per batch
+MAX_BATCH_SIZE = 500
 
 
 def store_insight_feedback(
@@ -53,24 +73,54 @@ def store_insight_feedback(
     Returns:
         Document ID of the stored feedback
     """
-    db = initialize_firestore()
+    return store_insight_feedback_bulk(
+        [{
+            'insight_id': insight_id,
+            'feedback_type': feedback_type,
+            'rating': rating,
+            'feedback_text': feedback_text,
+            'metadata': metadata
+        }],
+        collection_name=collection_name
+    )[0]
+
+
+def store_insight_feedback_bulk(
+    items: List[Dict[str, Any]],
+    collection_name: str = "insight_feedback"
+) -> List[str]:
+    """
+    Store many feedback entries using batched Firestore writes.
     
-    # Prepare feedback document
-    document = {
-        'insight_id': insight_id,
-        'feedback_type': feedback_type,
-        'rating': rating,
-        'feedback_text': feedback_text or '',
-        'metadata': metadata or {},
-        'created_at': datetime.utcnow(),
-        'version': '1.0'
-    }
+    Args:
+        items: List of dicts with keys insight_id, feedback_type, rating and
+               optional feedback_text / metadata
+        collection_name: Firestore collection name
+    
+    Returns:
+        Document IDs of the stored feedback, in input order
+    """
+    db = initialize_firestore()
+    collection = db.collection(collection_name)
     
-    # Store in Firestore
-    doc_ref = db.collection(collection_name).document()
-    doc_ref.set(document)
+    doc_ids = []
+    for start in range(0, len(items), MAX_BATCH_SIZE):
+        batch = db.batch()
+        for item in items[start:start + MAX_BATCH_SIZE]:
+            doc_ref = collection.document()
+            batch.set(doc_ref, {
+                'insight_id': item['insight_id'],
+                'feedback_type': item['feedback_type'],
+                'rating': item['rating'],
+                'feedback_text': item.get('feedback_text') or '',
+                'metadata': item.get('metadata') or {},
+                'created_at': datetime.utcnow(),
+                'version': '1.0'
+            })
+            doc_ids.append(doc_ref.id)
+        batch.commit()
     
-    return doc_ref.id
+    return doc_ids
 
 
 def get_feedback_for_insight(
@@ -123,15 +173,55 @@ def get_feedback_statistics(
     if insight_id:
         query = query.where('insight_id', '==', insight_id)
     
-    docs = query.stream()
+    try:
+        # Server-side aggregation: only the counts cross the wire
+        total_feedback = _count(query)
+        thumbs_up = _count(query.where('rating', '==', 'thumbs_up'))
+        thumbs_down = _count(query.where('rating', '==', 'thumbs_down'))
+        detailed_count = _count(query.where('feedback_text', '!=', ''))
+    except Exception:
+        # Aggregation queries unsupported (e.g. emulator) or missing index
+        total_feedback, thumbs_up, thumbs_down, detailed_count = _count_by_streaming(query)
+    
+    return {
+        'total_feedback': total_feedback,
+        'thumbs_up': thumbs_up,
+        'thumbs_down': thumbs_down,
+        'detailed_feedback_count': detailed_count,
+        'satisfaction_rate': (thumbs_up / total_feedback * 100) if total_feedback > 0 else 0
+    }
+
+
+def _count(query) -> int:
+    """
+    Count documents matching a query with a Firestore aggregation query.
+    
+    Args:
+        query: Firestore query or collection reference
+    
+    Returns:
+        Number of matching documents
+    """
+    return int(query.count().get()[0][0].value)
+
+
+def _count_by_streaming(query) -> tuple:
+    """
+    Count feedback by streaming every matching document.
+    
+    Args:
+        query: Firestore query or collection reference
     
-    # Calculate statistics
+    Returns:
+        Tuple of (total, thumbs_up, thumbs_down, detailed_count)
+    """
     total_feedback = 0
     thumbs_up = 0
     thumbs_down = 0
     detailed_count = 0
     
-    for doc in docs:
+    # Only the two counted fields are downloaded, not metadata blobs
+    for doc in query.select(['rating', 'feedback_text']).stream():
         data = doc.to_dict()
         total_feedback += 1
         
@@ -143,13 +233,7 @@ def get_feedback_statistics(
         if data.get('feedback_text'):
             detailed_count += 1
     
-    return {
-        'total_feedback': total_feedback,
-        'thumbs_up': thumbs_up,
-        'thumbs_down': thumbs_down,
-        'detailed_feedback_count': detailed_count,
-        'satisfaction_rate': (thumbs_up / total_feedback * 100) if total_feedback > 0 else 0
-    }
+    return total_feedback, thumbs_up, thumbs_down, detailed_count
 
 
 def get_recent_feedback(
@@ -3,17 +3,33 @@ Memory Store: Save project summaries to Firestore with embeddings for pattern de
 """
 
 import os
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+import numpy as np
 from google.cloud import firestore
-import vertexai
-from vertexai.language_models import TextEmbeddingModel
+from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+from google.cloud.firestore_v1.vector import Vector
+
+# The Vertex AI SDK is imported on first use (see _get_embedding_model) to keep
+# it off the cold-start path
+if TYPE_CHECKING:
+    from vertexai.language_models import TextEmbeddingModel
+
+
+# Firestore clients reused across calls, keyed by project ID
+_clients: Dict[str, firestore.Client] = {}
+_clients_lock = threading.Lock()
 
 
 def initialize_firestore(project_id: str = None) -> firestore.Client:
     """
     Initialize Firestore client.
     
+    The client (gRPC channel + credentials) is created once per project and
+    reused by every later call.
+    
     Args:
         project_id: GCP project ID (defaults to env var GCP_PROJECT_ID)
     
@@ -26,7 +42,47 @@ def initialize_firestore(project_id: str = None) -> firestore.Client:
     if not project_id:
         raise ValueError("GCP_PROJECT_ID must be set in environment or passed as argument")
     
-    return firestore.Client(project=project_id)
+    client = _clients.get(project_id)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(project_id)
+            if client is None:
+                client = firestore.Client(project=project_id)
+                _clients[project_id] = client
+    return client
+
+
+EMBEDDING_MODEL_NAME = "textembedding-gecko@003"
+# Maximum number of texts per get_embeddings request
+MAX_EMBEDDING_BATCH = 250
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+
+def _get_embedding_model(project_id: str = None) -> "TextEmbeddingModel":
+    """
+    Load the embedding model once and reuse it for every later call.
+    
+    Args:
+        project_id: GCP project ID (defaults to env var GCP_PROJECT_ID)
+    
+    Returns:
+        Cached TextEmbeddingModel instance
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                import vertexai
+                from vertexai.language_models import TextEmbeddingModel
+                
+                if project_id is None:
+                    project_id = os.getenv("GCP_PROJECT_ID")
+                if project_id:
+                    vertexai.init(project=project_id)
+                _embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+    return _embedding_model
 
 
 def generate_embedding(text: str, project_id: str = None) -> List[float]:
@@ -40,17 +96,52 @@ def generate_embedding(text: str, project_id: str = None) -> List[float]:
     Returns:
         List of floats representing the embedding vector
     """
-    if project_id is None:
-        project_id = os.getenv("GCP_PROJECT_ID")
+    return generate_embeddings_batch([text], project_id=project_id)[0]
+
+
+def generate_embeddings_batch(texts: List[str], project_id: str = None) -> List[List[float]]:
+    """
+    Generate embedding vectors for many texts with as few API calls as possible.
+    
+    Args:
+        texts: Texts to embed
+        project_id: GCP project ID
     
-    # Initialize Vertex AI if not already done
+    Returns:
+        One embedding per input text (empty lists if generation failed)
+    """
     try:
-        model = TextEmbeddingModel.from_pretrained("textembedding-gecko@003")
-        embeddings = model.get_embeddings([text])
-        return embeddings[0].values
+        model = _get_embedding_model(project_id)
+        vectors = []
+        for start in range(0, len(texts), MAX_EMBEDDING_BATCH):
+            embeddings = model.get_embeddings(texts[start:start + MAX_EMBEDDING_BATCH])
+            vectors.extend(embedding.values for embedding in embeddings)
+        return vectors
     except Exception as e:
         print(f"Warning: Failed to generate embedding: {str(e)}")
-        return []
+        return [[] for _ in texts]
+
+
+# Firestore commits at most 500 writes per batch
+MAX_BATCH_SIZE = 500
+
+# When Firestore vector search is unavailable (e.g. no vector index yet),
+# stored embeddings are mirrored in memory (L2-normalized) for this long, so
+# the fallback search doesn't re-read the whole collection on every request
+EMBEDDING_INDEX_TTL_SECONDS = 300
+
+# Most recent documents kept in the in-memory index (older ones are dropped)
+EMBEDDING_INDEX_MAX_ROWS = 10000
+
+# Document fields holding the int8 form of the embedding, the only embedding
+# data the fallback index downloads
+QUANTIZED_EMBEDDING_FIELDS = ('embedding_q', 'embedding_scale', 'embedding_dim')
+# All embedding fields (float Vector for find_nearest, plus the int8 form)
+EMBEDDING_FIELDS = ('embedding', *QUANTIZED_EMBEDDING_FIELDS)
+
+# collection name -> (loaded_at, normalized embedding matrix, project documents)
+_embedding_indexes: Dict[str, tuple] = {}
+_embedding_indexes_lock = threading.Lock()
 
 
 def store_project_insight(
@@ -73,28 +164,88 @@ def store_project_insight(
     Returns:
         Document ID of the stored insight
     """
+    return store_project_insights_bulk(
+        [{
+            'project_name': project_name,
+            'narrative': narrative,
+            'variance_summary': variance_summary,
+            'metadata': metadata
+        }],
+        collection_name=collection_name
+    )[0]
+
+
+def store_project_insights_bulk(
+    items: List[Dict[str, Any]],
+    collection_name: str = "project_insights"
+) -> List[str]:
+    """
+    Store many project insights using batched Firestore writes.
+    
+    Args:
+        items: List of dicts with keys project_name, narrative,
+               variance_summary and optional metadata
+        collection_name: Firestore collection name
+    
+    Returns:
+        Document IDs of the stored insights, in input order
+    """
     db = initialize_firestore()
+    collection = db.collection(collection_name)
     
-    # Generate embedding for semantic search
-    embedding_text = f"{project_name}\n{narrative}"
-    embedding = generate_embedding(embedding_text)
+    # Generate embeddings for semantic search in as few calls as possible
+    embeddings = generate_embeddings_batch(
+        [f"{item['project_name']}\n{item['narrative']}" for item in items]
+    )
     
-    # Prepare document
+    doc_ids = []
+    stored = []
+    for start in range(0, len(items), MAX_BATCH_SIZE):
+        batch = db.batch()
+        for item, embedding in zip(items[start:start + MAX_BATCH_SIZE],
+                                   embeddings[start:start + MAX_BATCH_SIZE]):
+            doc_ref = collection.document()
+            document = _build_insight_document(item, embedding)
+            batch.set(doc_ref, document)
+            doc_ids.append(doc_ref.id)
+            if embedding:
+                stored.append((doc_ref.id, document, embedding))
+        batch.commit()
+    
+    # New projects must show up in the next (fallback) similarity search
+    _append_to_embedding_index(collection_name, stored)
+    
+    return doc_ids
+
+
+def _build_insight_document(item: Dict[str, Any], embedding: List[float]) -> Dict[str, Any]:
+    """
+    Build the Firestore document for one project insight.
+    
+    The float Vector is kept only for find_nearest, which reads it on the
+    server and never sends it back. The int8 codes (about a quarter of its
+    size) are what the in-process fallback index downloads instead.
+    
+    Args:
+        item: Dict with project_name, narrative, variance_summary, metadata
+        embedding: Embedding vector for the project text
+    
+    Returns:
+        Document ready to be written
+    """
     document = {
-        'project_name': project_name,
-        'narrative': narrative,
-        'variance_summary': variance_summary,
-        'embedding': embedding,
-        'metadata': metadata or {},
+        'project_name': item['project_name'],
+        'narrative': item['narrative'],
+        'variance_summary': item['variance_summary'],
+        'metadata': item.get('metadata') or {},
         'created_at': datetime.utcnow(),
         'version': '1.0'
     }
+    if embedding:
+        document['embedding'] = Vector(embedding)
+        document.update(quantize_embedding(embedding))
     
-    # Store in Firestore
-    doc_ref = db.collection(collection_name).document()
-    doc_ref.set(document)
-    
-    return doc_ref.id
+    return document
 
 
 def retrieve_similar_projects(
@@ -122,23 +273,274 @@ def retrieve_similar_projects(
         print("Warning: Could not generate query embedding, returning empty results")
         return []
     
-    # Note: Firestore doesn't have native vector similarity search
-    # For production, consider using Vertex AI Vector Search or pgvector
-    # For now, we'll return recent projects as a placeholder
-    
-    docs = db.collection(collection_name).order_by(
-        'created_at', direction=firestore.Query.DESCENDING
-    ).limit(limit).stream()
+    try:
+        # Index-assisted nearest-neighbour search (needs a vector index on 'embedding')
+        docs = db.collection(collection_name).find_nearest(
+            vector_field='embedding',
+            query_vector=Vector(query_embedding),
+            distance_measure=DistanceMeasure.COSINE,
+            limit=limit
+        ).get()
+    except Exception as e:
+        print(f"Warning: Vector search unavailable ({str(e)}), ranking locally")
+        return _rank_locally(db, collection_name, query_embedding, limit)
     
     results = []
     for doc in docs:
         data = doc.to_dict()
+        for field in EMBEDDING_FIELDS:
+            data.pop(field, None)
         data['id'] = doc.id
         results.append(data)
     
     return results
 
 
+def _rank_locally(db, collection_name: str, query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+    """
+    Rank stored projects by cosine similarity in-process (fallback path).
+    
+    Args:
+        db: Firestore client
+        collection_name: Firestore collection name
+        query_embedding: Embedding of the query text
+        limit: Maximum number of results to return
+    
+    Returns:
+        Most similar project documents, best match first
+    """
+    embeddings, candidates = _embedding_index(db, collection_name)
+    if not candidates:
+        return []
+    
+    query = np.asarray(query_embedding, dtype=np.float32)
+    if embeddings.shape[1] != query.size:
+        return []
+    query_norm = np.linalg.norm(query)
+    if query_norm == 0:
+        return []
+    
+    # Rows are unit length, so cosine similarity is a single matrix-vector product
+    scores = embeddings @ (query / query_norm)
+    
+    if limit < len(scores):
+        top = np.argpartition(-scores, limit)[:limit]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top])]
+    
+    return [dict(candidates[i]) for i in top]
+
+
+def _embedding_index(db, collection_name: str) -> tuple:
+    """
+    Get the in-memory embedding index for a collection, reloading it after the TTL.
+    
+    Args:
+        db: Firestore client
+        collection_name: Firestore collection name
+    
+    Returns:
+        Tuple of (L2-normalized float32 embedding matrix, project documents)
+    """
+    with _embedding_indexes_lock:
+        entry = _embedding_indexes.get(collection_name)
+    if entry is not None and time.monotonic() - entry[0] < EMBEDDING_INDEX_TTL_SECONDS:
+        return entry[1], entry[2]
+    
+    collection = db.collection(collection_name)
+    docs = collection.select([
+        'project_name', 'narrative', 'variance_summary', 'created_at', *QUANTIZED_EMBEDDING_FIELDS
+    ]).order_by(
+        'created_at', direction=firestore.Query.DESCENDING
+    ).limit(EMBEDDING_INDEX_MAX_ROWS).stream()
+    rows = [(doc.id, doc.to_dict()) for doc in docs]
+    
+    # Documents stored before quantization only have the float list; fetch
+    # just that field, just for them
+    legacy = {doc_id: data for doc_id, data in rows if not data.get('embedding_q')}
+    if legacy:
+        refs = [collection.document(doc_id) for doc_id in legacy]
+        for snapshot in db.get_all(refs, field_paths=['embedding']):
+            if snapshot.exists:
+                legacy[snapshot.id]['embedding'] = snapshot.get('embedding')
+    
+    candidates = []
+    vectors = []
+    for doc_id, data in rows:
+        embedding = dequantize_embedding(data)
+        if embedding is None or (vectors and len(embedding) != len(vectors[0])):
+            continue
+        for field in EMBEDDING_FIELDS:
+            data.pop(field, None)
+        data['id'] = doc_id
+        candidates.append(data)
+        vectors.append(embedding)
+    
+    # Oldest first, so appended documents stay in created_at order
+    candidates.reverse()
+    vectors.reverse()
+    embeddings = _normalized_matrix(vectors)
+    
+    with _embedding_indexes_lock:
+        _embedding_indexes[collection_name] = (time.monotonic(), embeddings, candidates)
+    return embeddings, candidates
+
+
+def _append_to_embedding_index(collection_name: str, stored: List[tuple]) -> None:
+    """
+    Add newly stored documents to a loaded in-memory index, keeping at most
+    EMBEDDING_INDEX_MAX_ROWS rows (its TTL is not extended).
+    
+    Args:
+        collection_name: Firestore collection name
+        stored: (doc_id, document, embedding) for each stored insight
+    """
+    with _embedding_indexes_lock:
+        entry = _embedding_indexes.get(collection_name)
+        if entry is None or not stored:
+            # Nothing loaded yet; the next search reads the collection anyway
+            return
+        loaded_at, embeddings, candidates = entry
+        
+        dim = embeddings.shape[1] if candidates else len(stored[0][2])
+        new_candidates = []
+        new_vectors = []
+        for doc_id, document, embedding in stored:
+            if len(embedding) != dim:
+                continue
+            new_candidates.append({
+                'project_name': document['project_name'],
+                'narrative': document['narrative'],
+                'variance_summary': document['variance_summary'],
+                'created_at': document['created_at'],
+                'id': doc_id
+            })
+            new_vectors.append(np.asarray(embedding, dtype=np.float32))
+        if not new_vectors:
+            return
+        
+        new_rows = _normalized_matrix(new_vectors)
+        embeddings = np.concatenate([embeddings, new_rows]) if candidates else new_rows
+        candidates = candidates + new_candidates
+        if len(candidates) > EMBEDDING_INDEX_MAX_ROWS:
+            embeddings = embeddings[-EMBEDDING_INDEX_MAX_ROWS:]
+            candidates = candidates[-EMBEDDING_INDEX_MAX_ROWS:]
+        _embedding_indexes[collection_name] = (loaded_at, embeddings, candidates)
+
+
+def _normalized_matrix(vectors: List[np.ndarray]) -> np.ndarray:
+    """
+    Stack embedding vectors into a float32 matrix of unit-length rows.
+    
+    Args:
+        vectors: Equal-length float32 embedding arrays
+    
+    Returns:
+        (len(vectors), dim) matrix, or an empty (0, 0) matrix for no vectors
+    """
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32)
+    embeddings = np.stack(vectors)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.where(norms == 0, 1.0, norms)
+    return embeddings
+
+
+def quantize_embedding(embedding: List[float]) -> Dict[str, Any]:
+    """
+    Scalar-quantize an embedding to int8 with a per-vector scale.
+    
+    Args:
+        embedding: Float embedding vector
+    
+    Returns:
+        Dict with 'embedding_q' (int8 bytes), 'embedding_scale' and 'embedding_dim'
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    scale = float(np.max(np.abs(vector))) if vector.size else 0.0
+    if scale > 0:
+        codes = np.round(vector / scale * 127).astype(np.int8)
+    else:
+        codes = np.zeros(vector.size, dtype=np.int8)
+    
+    return {
+        'embedding_q': codes.tobytes(),
+        'embedding_scale': scale,
+        'embedding_dim': int(vector.size)
+    }
+
+
+def dequantize_embedding(data: Dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    Recover a float32 embedding from a stored project document.
+    
+    Handles both int8-quantized documents and older ones that stored the
+    raw float list under 'embedding'.
+    
+    Args:
+        data: Firestore document dictionary
+    
+    Returns:
+        float32 embedding array, or None if the document has no embedding
+    """
+    codes = data.get('embedding_q')
+    if codes:
+        return np.frombuffer(codes, dtype=np.int8).astype(np.float32) * (data['embedding_scale'] / 127)
+    
+    embedding = data.get('embedding')
+    if embedding:
+        return np.asarray(list(embedding), dtype=np.float32)
+    
+    return None
+
+
+def get_cached_narrative(
+    key: str,
+    max_age_seconds: float,
+    collection_name: str = "narrative_cache"
+) -> Optional[str]:
+    """
+    Look up a previously generated narrative by its cache key.
+    
+    Args:
+        key: Narrative cache key (hash of model name and prompt)
+        max_age_seconds: Entries older than this are treated as missing
+        collection_name: Firestore collection name
+    
+    Returns:
+        Cached narrative text, or None on a miss
+    """
+    doc = initialize_firestore().collection(collection_name).document(key).get()
+    if not doc.exists:
+        return None
+    
+    data = doc.to_dict()
+    created_at = data.get('created_at')
+    if created_at is None or (datetime.now(timezone.utc) - created_at).total_seconds() > max_age_seconds:
+        return None
+    return data.get('narrative')
+
+
+def store_cached_narrative(
+    key: str,
+    narrative: str,
+    collection_name: str = "narrative_cache"
+) -> None:
+    """
+    Save a generated narrative under its cache key.
+    
+    Args:
+        key: Narrative cache key (hash of model name and prompt)
+        narrative: Generated narrative text
+        collection_name: Firestore collection name
+    """
+    initialize_firestore().collection(collection_name).document(key).set({
+        'narrative': narrative,
+        'created_at': datetime.now(timezone.utc)
+    })
+
+
 def get_project_history(
     project_name: str,
     collection_name: str = "project_insights"
@@ -151,7 +553,7 @@ def get_project_history(
         collection_name: Firestore collection name
     
     Returns:
-        List of project insight documents
+        List of project insight documents (without their embeddings)
     """
     db = initialize_firestore()
     
@@ -162,6 +564,10 @@ def get_project_history(
     results = []
     for doc in docs:
         data = doc.to_dict()
+        # Vector / bytes embedding fields aren't JSON-serializable (and are
+        # only needed for similarity search)
+        for field in EMBEDDING_FIELDS:
+            data.pop(field, None)
         data['id'] = doc.id
         results.append(data)
     
@@ -170,7 +576,8 @@ def get_project_history(
 
 def get_all_projects(
     limit: int = 50,
-    collection_name: str = "project_insights"
+    collection_name: str = "project_insights",
+    fields: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
     """
     Retrieve all project insights from Firestore.
@@ -178,19 +585,27 @@ def get_all_projects(
     Args:
         limit: Maximum number of projects to return
         collection_name: Firestore collection name
+        fields: Optional field paths to fetch (e.g. to skip the embedding);
+                all fields are returned when None
     
     Returns:
-        List of all project insight documents
+        List of all project insight documents (without their embeddings)
     """
     db = initialize_firestore()
     
-    docs = db.collection(collection_name).order_by(
+    query = db.collection(collection_name)
+    if fields:
+        query = query.select(fields)
+    
+    docs = query.order_by(
         'created_at', direction=firestore.Query.DESCENDING
     ).limit(limit).stream()
     
     results = []
     for doc in docs:
         data = doc.to_dict()
+        for field in EMBEDDING_FIELDS:
+            data.pop(field, None)
         data['doc_id'] = doc.id
         # Ensure summary key exists for compatibility
         if 'variance_summary' in data:
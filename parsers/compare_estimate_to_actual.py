@@ -3,28 +3,233 @@ Parser: Compare Estimate to Actual
 Accepts two Excel files and produces a variance dataframe.
 """
 
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import BinaryIO, Dict, Any, List, Optional, Union
 
+# A workbook on disk, or an open binary file (e.g. an upload stream)
+ExcelSource = Union[str, BinaryIO]
 
-def load_excel(filepath: str, sheet_name: str = 0) -> pd.DataFrame:
+# In-process LRU of comparison results, keyed by the digests of the two input files
+RESULT_CACHE_SIZE = 16
+
+_result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# In-process LRU of parsed sheets keyed by file contents, so a workbook that is
+# uploaded again (e.g. the same estimate against a new actual) is not re-parsed
+FRAME_CACHE_SIZE = 32
+
+_frame_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_frame_cache_lock = threading.Lock()
+
+# Header names (lowercased) recognised as the category / amount columns, in priority order
+CATEGORY_CANDIDATES = ('category', 'name', 'item', 'description', 'line_item')
+AMOUNT_CANDIDATES = ('amount', 'cost', 'value', 'price', 'total')
+
+
+def _excel_file(source: ExcelSource) -> pd.ExcelFile:
+    """
+    Open a workbook with the calamine engine, falling back to pandas' default.
+    
+    Args:
+        source: Path to the Excel file, or a binary file object positioned at its start
+    
+    Returns:
+        pd.ExcelFile for the workbook
+    """
+    try:
+        return pd.ExcelFile(source, engine="calamine")
+    except (ImportError, ValueError):
+        # calamine not installed or unsupported by this pandas version
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return pd.ExcelFile(source)
+
+
+def load_excel(filepath: ExcelSource, sheet_name: str = 0, usecols: Any = 'auto',
+               digest: Optional[bytes] = None) -> pd.DataFrame:
     """
     Load an Excel file into a pandas DataFrame.
     
+    Uses the Rust-backed calamine engine (python-calamine) when available,
+    falling back to pandas' default engine otherwise. Parsed sheets are
+    cached by file contents, so reading the same workbook twice (even from a
+    different path) only parses it once.
+    
     Args:
-        filepath: Path to the Excel file
+        filepath: Path to the Excel file, or a binary file object (read from
+                  the start, so upload streams need not be saved to disk first)
         sheet_name: Sheet name or index (default: 0)
+        usecols: Columns to read. 'auto' (default) peeks at the header row and
+                 reads only the category/amount columns when both can be
+                 identified by name; None reads every column; anything else
+                 is passed through to pandas.
+        digest: Precomputed _file_digest of the file, to avoid hashing it twice
     
     Returns:
         DataFrame with the Excel data
     """
     try:
-        df = pd.read_excel(filepath, sheet_name=sheet_name)
+        # Keyed on contents only, so the same workbook under another path
+        # (or as an upload stream) hits the cache
+        key = (digest or _file_digest(filepath), sheet_name, repr(usecols))
+        with _frame_cache_lock:
+            cached = _frame_cache.get(key)
+            if cached is not None:
+                _frame_cache.move_to_end(key)
+                return cached.copy()
+        
+        # Only the parsed sheet is cached; the workbook is closed right away
+        with _excel_file(filepath) as book:
+            if isinstance(usecols, str) and usecols == 'auto':
+                header = book.parse(sheet_name, nrows=0).columns
+                usecols = _detect_usecols(header)
+            df = book.parse(sheet_name, usecols=usecols)
+        
+        with _frame_cache_lock:
+            _frame_cache[key] = df.copy()
+            while len(_frame_cache) > FRAME_CACHE_SIZE:
+                _frame_cache.popitem(last=False)
         return df
     except Exception as e:
         raise ValueError(f"Failed to load Excel file {filepath}: {str(e)}")
 
 
+def _detect_usecols(header: pd.Index) -> Optional[List[int]]:
+    """
+    Pick the positions of the category and amount columns from a header row.
+    
+    Args:
+        header: Column labels of the sheet
+    
+    Returns:
+        Sorted column positions to read, or None if the amount column can only
+        be found by inspecting data types (in which case every column is read)
+    """
+    if len(header) == 0:
+        return None
+    
+    positions = _match_columns(header)
+    category_pos = positions['category'] if positions['category'] is not None else 0
+    if positions['amount'] is None:
+        return None
+    
+    return sorted({category_pos, positions['amount']})
+
+
+def _match_columns(columns: pd.Index) -> Dict[str, Optional[int]]:
+    """
+    Find the category/amount columns by header name.
+    
+    Args:
+        columns: Column labels
+    
+    Returns:
+        Dict with the 'category' and 'amount' column positions (None if no
+        header matches a candidate name)
+    """
+    # Map normalized header -> position (first occurrence wins)
+    positions = {}
+    for pos, col in enumerate(columns):
+        positions.setdefault(str(col).lower().strip(), pos)
+    
+    return {
+        'category': next((positions[c] for c in CATEGORY_CANDIDATES if c in positions), None),
+        'amount': next((positions[c] for c in AMOUNT_CANDIDATES if c in positions), None)
+    }
+
+
+def load_excel_pair(estimate_path: ExcelSource, actual_path: ExcelSource,
+                    digests: Optional[tuple] = None) -> tuple:
+    """
+    Load the estimate and actual Excel files concurrently.
+    
+    Excel parsing is mostly zip/XML work in C/Rust extensions, so two
+    threads roughly halve the wall-clock time of loading both files.
+    
+    Args:
+        estimate_path: Path to (or binary file of) the estimate Excel file
+        actual_path: Path to (or binary file of) the actual Excel file
+        digests: Optional precomputed (estimate, actual) file digests
+    
+    Returns:
+        Tuple of (estimate_df, actual_df)
+    """
+    digests = digests or (None, None)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        estimate_df, actual_df = executor.map(
+            lambda path, digest: load_excel(path, digest=digest),
+            [estimate_path, actual_path], digests
+        )
+    return estimate_df, actual_df
+
+
+def compare_excel_files(estimate_path: ExcelSource, actual_path: ExcelSource) -> tuple:
+    """
+    Load two Excel files and compare them, reusing cached results for identical inputs.
+    
+    The cache key is a digest of the raw file bytes, so a resubmitted
+    estimate/actual pair skips Excel parsing, the merge and the summary
+    statistics entirely. Callers get copies, so mutating a result does not
+    alter the cached one.
+    
+    Args:
+        estimate_path: Path to (or binary file of) the estimate Excel file
+        actual_path: Path to (or binary file of) the actual Excel file
+    
+    Returns:
+        Tuple of (variance_df, category_mapping_dict, summary_stats)
+    """
+    digests = (_file_digest(estimate_path), _file_digest(actual_path))
+    with _result_cache_lock:
+        cached = _result_cache.get(digests)
+        if cached is not None:
+            _result_cache.move_to_end(digests)
+    
+    if cached is None:
+        estimate_df, actual_df = load_excel_pair(estimate_path, actual_path, digests)
+        variance_df, category_mapping = compare_estimates(estimate_df, actual_df)
+        cached = (variance_df, category_mapping, generate_summary_stats(variance_df))
+        with _result_cache_lock:
+            _result_cache[digests] = cached
+            while len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+    
+    variance_df, category_mapping, summary_stats = cached
+    return variance_df.copy(), copy.deepcopy(category_mapping), copy.deepcopy(summary_stats)
+
+
+def _file_digest(filepath: ExcelSource) -> bytes:
+    """
+    Hash a file's contents with BLAKE2b.
+    
+    Args:
+        filepath: Path to the file, or a binary file object (hashed from the
+                  start and rewound afterwards)
+    
+    Returns:
+        Raw digest bytes
+    """
+    digest = hashlib.blake2b()
+    if hasattr(filepath, 'read'):
+        filepath.seek(0)
+        for chunk in iter(lambda: filepath.read(1024 * 1024), b''):
+            digest.update(chunk)
+        filepath.seek(0)
+        return digest.digest()
+    
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
 def compare_estimates(estimate_df: pd.DataFrame, actual_df: pd.DataFrame) -> tuple:
     """
     Compare estimate and actual dataframes to calculate variance.
@@ -44,78 +249,113 @@ def compare_estimates(estimate_df: pd.DataFrame, actual_df: pd.DataFrame) -> tup
     estimate_norm = _normalize_columns(estimate_df)
     actual_norm = _normalize_columns(actual_df)
     
-    # Track categories before merge for mapping info
-    estimate_categories = set(estimate_norm['category'].tolist())
-    actual_categories = set(actual_norm['category'].tolist())
+    # Recode both sides onto one shared dtype so groupby/merge join on int codes
+    category_dtype = pd.CategoricalDtype(categories=pd.unique(np.concatenate([
+        estimate_norm['category'].to_numpy(), actual_norm['category'].to_numpy()
+    ])))
+    estimate_norm['category'] = estimate_norm['category'].astype(category_dtype)
+    actual_norm['category'] = actual_norm['category'].astype(category_dtype)
+    
+    # Sum duplicate line items per category so the merge is one-to-one
+    estimate_agg = estimate_norm.groupby('category', sort=False, observed=True, as_index=False)['amount'].sum()
+    actual_agg = actual_norm.groupby('category', sort=False, observed=True, as_index=False)['amount'].sum()
     
     # Merge on category
     merged = pd.merge(
-        estimate_norm[['category', 'amount']],
-        actual_norm[['category', 'amount']],
+        estimate_agg,
+        actual_agg,
         on='category',
         how='outer',
-        suffixes=('_estimate', '_actual')
+        sort=False,
+        suffixes=('_estimate', '_actual'),
+        validate='one_to_one'
     )
     
     # Build category mapping info before filling NaNs
-    matched_categories = []
-    estimate_only = []
-    actual_only = []
-    
-    for _, row in merged.iterrows():
-        category = row['category']
-        has_estimate = pd.notna(row['amount_estimate']) and row['amount_estimate'] != 0
-        has_actual = pd.notna(row['amount_actual']) and row['amount_actual'] != 0
-        
-        if has_estimate and has_actual:
-            matched_categories.append({
-                'category': category,
-                'estimated': float(row['amount_estimate']),
-                'actual': float(row['amount_actual'])
-            })
-        elif has_estimate and not has_actual:
-            estimate_only.append({
-                'category': category,
-                'estimated': float(row['amount_estimate'])
-            })
-        elif has_actual and not has_estimate:
-            actual_only.append({
-                'category': category,
-                'actual': float(row['amount_actual'])
-            })
+    est = merged['amount_estimate']
+    act = merged['amount_actual']
+    has_estimate = est.notna() & (est != 0)
+    has_actual = act.notna() & (act != 0)
+    
+    matched_categories = _mapping_records(
+        merged, has_estimate & has_actual,
+        {'amount_estimate': 'estimated', 'amount_actual': 'actual'}
+    )
+    estimate_only_mask = has_estimate & ~has_actual
+    estimate_only = _mapping_records(
+        merged, estimate_only_mask, {'amount_estimate': 'estimated'}
+    )
+    actual_only_mask = has_actual & ~has_estimate
+    actual_only = _mapping_records(
+        merged, actual_only_mask, {'amount_actual': 'actual'}
+    )
     
     category_mapping = {
         'matched_categories': matched_categories,
         'estimate_only_categories': estimate_only,
         'actual_only_categories': actual_only,
+        # Names alone, parallel to the lists above, for consumers that only list categories
+        'estimate_only_names': merged.loc[estimate_only_mask, 'category'].tolist(),
+        'actual_only_names': merged.loc[actual_only_mask, 'category'].tolist(),
         'match_summary': {
             'total_matched': len(matched_categories),
             'total_estimate_only': len(estimate_only),
             'total_actual_only': len(actual_only),
-            'match_rate_pct': (len(matched_categories) / max(len(estimate_categories), 1)) * 100
+            'match_rate_pct': (len(matched_categories) / max(len(estimate_agg), 1)) * 100
         }
     }
     
-    # Fill NaN values with 0
-    merged['amount_estimate'] = merged['amount_estimate'].fillna(0)
-    merged['amount_actual'] = merged['amount_actual'].fillna(0)
+    # Calculate variance (missing amounts count as 0; percentage is 0 where nothing was estimated)
+    est = est.fillna(0).to_numpy()
+    act = act.fillna(0).to_numpy()
+    variance = act - est
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance_pct = np.where(est != 0, variance / est * 100.0, 0.0)
     
-    # Calculate variance
-    merged['variance'] = merged['amount_actual'] - merged['amount_estimate']
-    merged['variance_pct'] = (
-        (merged['variance'] / merged['amount_estimate']) * 100
-    ).replace([float('inf'), -float('inf')], 0).fillna(0)
+    variance_df = pd.DataFrame({
+        'Category': merged['category'].array,
+        'Estimated': est,
+        'Actual': act,
+        'Variance': variance,
+        'Variance_%': variance_pct
+    }, copy=False)
+    
+    return variance_df, category_mapping
+
+
+def _mapping_records(merged: pd.DataFrame, mask: pd.Series, amounts: Dict[str, str]) -> list:
+    """
+    Extract category mapping entries for the rows selected by a mask.
     
-    # Rename for clarity
-    merged.rename(columns={
-        'category': 'Category',
-        'amount_estimate': 'Estimated',
-        'amount_actual': 'Actual',
-        'variance': 'Variance',
-        'variance_pct': 'Variance_%'
-    }, inplace=True)
+    Args:
+        merged: Merged estimate/actual DataFrame
+        mask: Boolean row mask
+        amounts: Mapping of merged amount column -> output key
     
-    return merged, category_mapping
+    Returns:
+        List of dicts with 'category' plus the renamed amount keys (as floats)
+    """
+    selected = merged.loc[mask, ['category', *amounts]].astype({col: float for col in amounts})
+    return selected.rename(columns=amounts).to_dict('records')
+
+
+def _categorize_labels(values: pd.Series) -> pd.Categorical:
+    """
+    Convert raw category cells to a string Categorical.
+    
+    Equivalent to values.astype(str).astype('category') (blanks become 'nan'),
+    but only the distinct values are converted to strings rather than every cell.
+    
+    Args:
+        values: Raw category column
+    
+    Returns:
+        Categorical of string labels, categories in first-appearance order
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    # Distinct raw values can collapse to one label (e.g. 1 and '1'), so factorize again
+    label_codes, labels = pd.factorize(np.asarray(uniques, dtype=object).astype(str))
+    return pd.Categorical.from_codes(label_codes[codes], categories=labels)
 
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -128,41 +368,26 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with normalized 'category' and 'amount' columns
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower().str.strip()
-    
-    # Find category column
-    category_candidates = ['category', 'name', 'item', 'description', 'line_item']
-    category_col = None
-    for candidate in category_candidates:
-        if candidate in df.columns:
-            category_col = candidate
-            break
-    
-    if category_col is None:
-        # Use first column as category
-        category_col = df.columns[0]
-    
-    # Find amount column
-    amount_candidates = ['amount', 'cost', 'value', 'price', 'total']
-    amount_col = None
-    for candidate in amount_candidates:
-        if candidate in df.columns:
-            amount_col = candidate
-            break
-    
-    if amount_col is None:
-        # Use first numeric column
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        if len(numeric_cols) > 0:
-            amount_col = numeric_cols[0]
-        else:
+    positions = _match_columns(df.columns)
+    
+    # Find category column (fall back to the first column)
+    category_pos = positions['category'] if positions['category'] is not None else 0
+    
+    # Find amount column (fall back to the first numeric column)
+    amount_pos = positions['amount']
+    if amount_pos is None:
+        amount_pos = next(
+            (pos for pos, dtype in enumerate(df.dtypes)
+             if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)),
+            None
+        )
+        if amount_pos is None:
             raise ValueError("Could not find numeric amount column")
     
-    # Create normalized dataframe
+    # Create normalized dataframe (categories stored as int codes, not Python strings)
     normalized = pd.DataFrame({
-        'category': df[category_col].astype(str),
-        'amount': pd.to_numeric(df[amount_col], errors='coerce').fillna(0)
+        'category': _categorize_labels(df.iloc[:, category_pos]),
+        'amount': pd.to_numeric(df.iloc[:, amount_pos], errors='coerce').fillna(0.0).astype('float64')
     })
     
     return normalized
@@ -178,27 +403,32 @@ def generate_summary_stats(variance_df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dictionary with summary statistics
     """
-    total_estimated = variance_df['Estimated'].sum()
-    total_actual = variance_df['Actual'].sum()
-    total_variance = variance_df['Variance'].sum()
+    variance = variance_df['Variance'].to_numpy()
+    categories = variance_df['Category'].to_numpy()
     
-    over_budget = variance_df[variance_df['Variance'] > 0]
-    under_budget = variance_df[variance_df['Variance'] < 0]
+    total_estimated = float(variance_df['Estimated'].sum())
+    total_actual = float(variance_df['Actual'].sum())
+    total_variance = float(variance.sum())
+    
+    over_count = int((variance > 0).sum())
+    under_count = int((variance < 0).sum())
+    # With at least one positive (negative) row, the global argmax (argmin) is the biggest overrun (underrun)
+    overrun_idx = int(variance.argmax()) if over_count else None
+    underrun_idx = int(variance.argmin()) if under_count else None
     
     return {
-        'total_estimated': float(total_estimated),
-        'total_actual': float(total_actual),
-        'total_variance': float(total_variance),
-        'total_variance_pct': float((total_variance / total_estimated * 100) if total_estimated > 0 else 0),
-        'over_budget_categories': len(over_budget),
-        'under_budget_categories': len(under_budget),
+        'total_estimated': total_estimated,
+        'total_actual': total_actual,
+        'total_variance': total_variance,
+        'total_variance_pct': (total_variance / total_estimated * 100) if total_estimated > 0 else 0.0,
+        'over_budget_categories': over_count,
+        'under_budget_categories': under_count,
         'biggest_overrun': {
-            'category': over_budget.loc[over_budget['Variance'].idxmax(), 'Category'] if len(over_budget) > 0 else None,
-            'amount': float(over_budget['Variance'].max()) if len(over_budget) > 0 else 0
+            'category': categories[overrun_idx] if overrun_idx is not None else None,
+            'amount': float(variance[overrun_idx]) if overrun_idx is not None else 0
         },
         'biggest_underrun': {
-            'category': under_budget.loc[under_budget['Variance'].idxmin(), 'Category'] if len(under_budget) > 0 else None,
-            'amount': float(under_budget['Variance'].min()) if len(under_budget) > 0 else 0
+            'category': categories[underrun_idx] if underrun_idx is not None else None,
+            'amount': float(variance[underrun_idx]) if underrun_idx is not None else 0
         }
     }
-
@@ -11,24 +11,300 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, KeepTogether
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from reportlab.pdfbase.pdfmetrics import getFont
+import copy
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from datetime import datetime
-from typing import Dict, Any, List
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Union, BinaryIO
 
+# Load the metrics of the only fonts the report uses at import, so the
+# first report doesn't pay for it and later lookups are registry hits
+for _font_name in ('Helvetica', 'Helvetica-Bold'):
+    getFont(_font_name)
 
-def generate_project_pdf(project_data: Dict[str, Any]) -> BytesIO:
+# Palette, parsed once and shared by the paragraph and table styles
+TITLE_COLOR = colors.HexColor('#1e40af')
+SUBTITLE_COLOR = colors.HexColor('#6b7280')
+HEADING_COLOR = colors.HexColor('#1f2937')
+HEADING_BACKGROUND = colors.HexColor('#e5e7eb')
+TEXT_COLOR = colors.HexColor('#374151')
+MUTED_COLOR = colors.HexColor('#9ca3af')
+TABLE_HEADER_BACKGROUND = colors.HexColor('#d1d5db')
+
+# Styles are built once at import and shared by every report
+_SAMPLE_STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'ReportTitle',
+    parent=_SAMPLE_STYLES['Title'],
+    fontSize=16,
+    textColor=TITLE_COLOR,
+    spaceAfter=4,
+    alignment=TA_CENTER,
+    fontName='Helvetica-Bold'
+)
+
+SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    parent=_SAMPLE_STYLES['Normal'],
+    fontSize=9,
+    textColor=SUBTITLE_COLOR,
+    spaceAfter=10,
+    alignment=TA_CENTER
+)
+
+SECTION_HEADING_STYLE = ParagraphStyle(
+    'SectionHeading',
+    parent=_SAMPLE_STYLES['Heading1'],
+    fontSize=11,
+    textColor=HEADING_COLOR,
+    spaceAfter=6,
+    spaceBefore=10,
+    fontName='Helvetica-Bold',
+    backColor=HEADING_BACKGROUND,
+    leftIndent=4,
+    rightIndent=4
+)
+
+SUBSECTION_STYLE = ParagraphStyle(
+    'Subsection',
+    parent=_SAMPLE_STYLES['Heading2'],
+    fontSize=10,
+    textColor=TEXT_COLOR,
+    spaceAfter=4,
+    spaceBefore=6,
+    fontName='Helvetica-Bold'
+)
+
+BODY_STYLE = ParagraphStyle(
+    'Body',
+    parent=_SAMPLE_STYLES['Normal'],
+    fontSize=9,
+    textColor=TEXT_COLOR,
+    spaceAfter=4,
+    leading=11
+)
+
+BODY_BOLD_STYLE = ParagraphStyle(
+    'BodyBold',
+    parent=BODY_STYLE,
+    fontName='Helvetica-Bold'
+)
+
+FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=_SAMPLE_STYLES['Normal'],
+    fontSize=7,
+    textColor=MUTED_COLOR,
+    alignment=TA_CENTER
+)
+
+FOOTER_POWERED_TEXT = "Powered by Estimate Insight - AI-Powered Cost Variance Analysis"
+FOOTER_COPYRIGHT_TEMPLATE = "© {year} Builder's Business Partner LLC"
+
+# Overall status wording, indexed by the sign of the total variance
+STATUS_LABELS = {1: "over budget", -1: "under budget", 0: "on budget"}
+
+# "Recommended Actions" items; identical in every report
+RECOMMENDATION_TEXTS = (
+    "1. <b>Refine Future Estimates:</b> Use actual costs from this project to create more accurate "
+    "initial estimates. Focus on categories with significant variances and adjust assumptions accordingly.",
+    "2. <b>Enhance Project Management:</b> Implement more rigorous cost tracking and earned value "
+    "management (EVM) for real-time monitoring and course correction during project execution.",
+    "3. <b>Strengthen Vendor Negotiation:</b> Replicate cost-saving strategies from categories that "
+    "came in under budget. Standardize processes for negotiating bulk discounts with suppliers.",
+    "4. <b>Review Scope Management:</b> Address unbudgeted items by improving initial scope definition "
+    "and implementing formal change order processes to track and approve scope changes.",
+)
+
+# Static "Lessons Learned" bullets
+CONTINGENCY_LESSON_TEXT = "• Future projects should include contingency buffers for high-variance categories"
+UNDER_BUDGET_LESSON_TEXTS = (
+    "• Cost savings demonstrate effective project management and resource allocation",
+    "• Document successful practices for replication in future projects",
+)
+
+
+def _preparse(texts, style: ParagraphStyle) -> tuple:
+    """
+    Run ReportLab's markup parser once for fixed paragraph texts.
+    
+    Args:
+        texts: Paragraph markup strings
+        style: Style the paragraphs will be rendered with
+    
+    Returns:
+        Tuple of (text, frags) pairs for _paragraphs()
+    """
+    return tuple((text, Paragraph(text, style).frags) for text in texts)
+
+
+def _paragraphs(preparsed: tuple, style: ParagraphStyle) -> List[Paragraph]:
+    """
+    Create Paragraphs from preparsed text without parsing it again.
+    
+    Paragraph objects keep layout state from wrap()/split(), so they are not
+    shared between builds; each call gets fresh objects over copied fragments.
+    
+    Args:
+        preparsed: Output of _preparse()
+        style: Style the text was preparsed with
+    
+    Returns:
+        New Paragraph flowables
+    """
+    return [
+        Paragraph(text, style, frags=[copy.copy(frag) for frag in frags])
+        for text, frags in preparsed
+    ]
+
+INFO_TABLE_COL_WIDTHS = (1.5*inch, 5*inch)
+INFO_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('TEXTCOLOR', (0, 0), (-1, -1), TEXT_COLOR),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+
+BUDGET_TABLE_COL_WIDTHS = (3*inch, 2*inch)
+BUDGET_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), TABLE_HEADER_BACKGROUND),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (0, -1), 'Helvetica'),
+    ('FONTNAME', (1, 1), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('GRID', (0, 0), (-1, -1), 0.5, MUTED_COLOR),
+])
+
+_REC_PARSED = _preparse(RECOMMENDATION_TEXTS, BODY_STYLE)
+_CONTINGENCY_LESSON_PARSED = _preparse((CONTINGENCY_LESSON_TEXT,), BODY_STYLE)
+_UNDER_BUDGET_LESSONS_PARSED = _preparse(UNDER_BUDGET_LESSON_TEXTS, BODY_STYLE)
+
+
+@lru_cache(maxsize=1)
+def _footer_parsed(year: int) -> tuple:
+    """
+    Preparsed footer lines for a given copyright year.
+    
+    Cached on the year, so the footer is parsed once and again only when a
+    long-running process crosses New Year.
+    
+    Args:
+        year: Copyright year
+    
+    Returns:
+        Preparsed footer text for _paragraphs()
+    """
+    return _preparse(
+        (FOOTER_POWERED_TEXT, FOOTER_COPYRIGHT_TEMPLATE.format(year=year)),
+        FOOTER_STYLE
+    )
+
+
+@dataclass(slots=True)
+class ReportRecord:
+    """Flat, fixed-shape view of the project_data fields the PDF report reads."""
+    project_name: str = 'Unnamed Project'
+    narrative: str = ''
+    created_at: Any = None
+    
+    has_summary: bool = False
+    total_estimated: float = 0
+    total_actual: float = 0
+    total_variance: float = 0
+    variance_pct: float = 0
+    over_budget: int = 0
+    under_budget: int = 0
+    overrun_cat: str = 'Unknown'
+    overrun_amt: float = 0
+    underrun_cat: str = 'Unknown'
+    underrun_amt: float = 0
+    
+    has_category_mapping: bool = False
+    matched: int = 0
+    estimate_only: int = 0
+    actual_only: int = 0
+    match_rate: float = 0
+    actual_only_names: List[str] = field(default_factory=list)
+    
+    @classmethod
+    def from_project_data(cls, project_data: Union[Dict[str, Any], bytes, str]) -> 'ReportRecord':
+        """
+        Flatten a project_data dictionary (or its JSON encoding) into a record.
+        
+        Args:
+            project_data: Dictionary containing project information
+        
+        Returns:
+            ReportRecord with every field the report needs
+        """
+        if isinstance(project_data, (bytes, str)):
+            project_data = json.loads(project_data)
+        
+        summary = project_data.get('summary') or project_data.get('variance_summary') or {}
+        category_mapping = project_data.get('category_mapping') or {}
+        biggest_overrun = summary.get('biggest_overrun') or {}
+        biggest_underrun = summary.get('biggest_underrun') or {}
+        match_summary = category_mapping.get('match_summary') or {}
+        
+        return cls(
+            project_name=project_data.get('project_name', 'Unnamed Project'),
+            narrative=project_data.get('narrative', ''),
+            created_at=project_data.get('created_at'),
+            has_summary=bool(summary),
+            total_estimated=summary.get('total_estimated', 0),
+            total_actual=summary.get('total_actual', 0),
+            total_variance=summary.get('total_variance', 0),
+            variance_pct=summary.get('total_variance_pct', 0),
+            over_budget=summary.get('over_budget_categories', 0),
+            under_budget=summary.get('under_budget_categories', 0),
+            overrun_cat=biggest_overrun.get('category', 'Unknown'),
+            overrun_amt=biggest_overrun.get('amount', 0),
+            underrun_cat=biggest_underrun.get('category', 'Unknown'),
+            underrun_amt=biggest_underrun.get('amount', 0),
+            has_category_mapping=bool(category_mapping),
+            matched=match_summary.get('total_matched', 0),
+            estimate_only=match_summary.get('total_estimate_only', 0),
+            actual_only=match_summary.get('total_actual_only', 0),
+            match_rate=match_summary.get('match_rate_pct', 0),
+            actual_only_names=_category_names(category_mapping, 'actual_only')
+        )
+
+
+def generate_project_pdf(
+    project_data: Union[Dict[str, Any], ReportRecord, bytes, str],
+    out: Optional[BinaryIO] = None
+) -> Optional[BytesIO]:
     """
     Generate a comprehensive multi-page PDF report for project post-mortem analysis.
     
     Args:
-        project_data: Dictionary containing project information
+        project_data: Dictionary containing project information, its JSON
+                      encoding, or a ReportRecord built from it
+        out: Optional binary-mode writable stream (open file, upload stream)
+             to write the PDF to instead of an in-memory buffer
     
     Returns:
-        BytesIO object containing the PDF
+        BytesIO object containing the PDF, or None when written to out
     """
-    buffer = BytesIO()
+    # Not pre-sized: ReportLab assembles the whole PDF in memory and hands it
+    # to the buffer in a single write(), so BytesIO never grows incrementally
+    buffer = BytesIO() if out is None else out
     
-    # Create PDF
+    # Create PDF. build() lays flowables out in a single pass; nearly all of its
+    # time is paragraph line breaking, which a hand-drawn canvas would still
+    # need, and Platypus also handles page breaks and inline <b> markup
     doc = SimpleDocTemplate(
         buffer,
         pagesize=letter,
@@ -39,389 +315,304 @@ def generate_project_pdf(project_data: Dict[str, Any]) -> BytesIO:
     )
     
     elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'ReportTitle',
-        parent=styles['Title'],
-        fontSize=16,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=4,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#6b7280'),
-        spaceAfter=10,
-        alignment=TA_CENTER
-    )
-    
-    section_heading_style = ParagraphStyle(
-        'SectionHeading',
-        parent=styles['Heading1'],
-        fontSize=11,
-        textColor=colors.HexColor('#1f2937'),
-        spaceAfter=6,
-        spaceBefore=10,
-        fontName='Helvetica-Bold',
-        backColor=colors.HexColor('#e5e7eb'),
-        leftIndent=4,
-        rightIndent=4
-    )
-    
-    subsection_style = ParagraphStyle(
-        'Subsection',
-        parent=styles['Heading2'],
-        fontSize=10,
-        textColor=colors.HexColor('#374151'),
-        spaceAfter=4,
-        spaceBefore=6,
-        fontName='Helvetica-Bold'
-    )
     
-    body_style = ParagraphStyle(
-        'Body',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#374151'),
-        spaceAfter=4,
-        leading=11
-    )
-    
-    body_bold_style = ParagraphStyle(
-        'BodyBold',
-        parent=body_style,
-        fontName='Helvetica-Bold'
-    )
+    # Extract data: every field is read once into a flat record
+    rec = project_data if isinstance(project_data, ReportRecord) else ReportRecord.from_project_data(project_data)
     
-    # Extract data
-    project_name = project_data.get('project_name', 'Unnamed Project')
-    narrative = project_data.get('narrative', '')
-    summary = project_data.get('summary') or project_data.get('variance_summary', {})
-    created_at = project_data.get('created_at')
-    category_mapping = project_data.get('category_mapping', {})
-    metadata = project_data.get('metadata', {})
+    # Magnitudes and their display text, shared by several sections
+    abs_variance_pct = abs(rec.variance_pct)
+    abs_variance_text = f"${abs(rec.total_variance):,.2f}"
+    abs_variance_pct_text = f"{abs_variance_pct:.1f}%"
     
     # Date handling
-    if created_at:
-        if hasattr(created_at, 'strftime'):
-            report_date = created_at.strftime('%B %d, %Y')
-            reporting_period = created_at.strftime('%B %Y')
+    if rec.created_at:
+        if hasattr(rec.created_at, 'strftime'):
+            report_date = rec.created_at.strftime('%B %d, %Y')
+            reporting_period = rec.created_at.strftime('%B %Y')
         else:
-            report_date = str(created_at)
-            reporting_period = str(created_at)
+            report_date = str(rec.created_at)
+            reporting_period = str(rec.created_at)
     else:
-        report_date = datetime.now().strftime('%B %d, %Y')
-        reporting_period = datetime.now().strftime('%B %Y')
+        now = datetime.now()
+        report_date = now.strftime('%B %d, %Y')
+        reporting_period = now.strftime('%B %Y')
     
     # ===== HEADER =====
-    elements.append(Paragraph(
-        "AI-GENERATED ESTIMATE INSIGHT REPORT: PROJECT POST-MORTEM",
-        title_style
-    ))
-    elements.append(Spacer(1, 0.1*inch))
-    
     # Project info table
     project_info = [
-        ['Project Name:', project_name],
+        ['Project Name:', rec.project_name],
         ['Reporting Period:', reporting_period],
         ['Report Generated On:', report_date]
     ]
     
-    info_table = Table(project_info, colWidths=[1.5*inch, 5*inch])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#374151')),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-    ]))
+    info_table = Table(project_info, colWidths=INFO_TABLE_COL_WIDTHS)
+    info_table.setStyle(INFO_TABLE_STYLE)
     
-    elements.append(info_table)
-    elements.append(Spacer(1, 0.15*inch))
+    elements.extend([
+        Paragraph("AI-GENERATED ESTIMATE INSIGHT REPORT: PROJECT POST-MORTEM", TITLE_STYLE),
+        Spacer(1, 0.1*inch),
+        info_table,
+        Spacer(1, 0.15*inch),
+    ])
     
     # ===== 1. PROJECT BUDGET SUMMARY =====
     elements.append(Paragraph(
         "1. PROJECT BUDGET SUMMARY: OVERALL PERFORMANCE",
-        section_heading_style
+        SECTION_HEADING_STYLE
     ))
     
-    if summary:
-        total_estimated = summary.get('total_estimated', 0)
-        total_actual = summary.get('total_actual', 0)
-        total_variance = summary.get('total_variance', 0)
-        variance_pct = summary.get('total_variance_pct', 0)
-        
-        status = "over budget" if total_variance > 0 else "under budget" if total_variance < 0 else "on budget"
-        
-        elements.append(Paragraph(
-            f"<b>Overall Performance:</b> This project came in {status} by ${abs(total_variance):,.2f} ({abs(variance_pct):.1f}%)",
-            body_style
-        ))
-        elements.append(Spacer(1, 0.05*inch))
+    if rec.has_summary:
+        status = STATUS_LABELS[(rec.total_variance > 0) - (rec.total_variance < 0)]
         
         # Budget overview table
         budget_data = [
-            ['<b>Budget Overview</b>', '<b>Amount</b>'],
-            ['Original Budget', f'${total_estimated:,.2f}'],
-            ['Actual Spending', f'${total_actual:,.2f}'],
-            ['Difference', f'${total_variance:+,.2f}']
+            ['Budget Overview', 'Amount'],  # header row is bolded by BUDGET_TABLE_STYLE
+            ['Original Budget', f'${rec.total_estimated:,.2f}'],
+            ['Actual Spending', f'${rec.total_actual:,.2f}'],
+            ['Difference', f'${rec.total_variance:+,.2f}']
         ]
         
-        budget_table = Table(budget_data, colWidths=[3*inch, 2*inch])
-        budget_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d1d5db')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica'),
-            ('FONTNAME', (1, 1), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#9ca3af')),
-        ]))
+        budget_table = Table(budget_data, colWidths=BUDGET_TABLE_COL_WIDTHS)
+        budget_table.setStyle(BUDGET_TABLE_STYLE)
         
-        elements.append(budget_table)
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # ===== 2. CATEGORY & METRIC BREAKDOWN =====
-    elements.append(Paragraph(
-        "2. CATEGORY & METRIC BREAKDOWN: VARIANCE ANALYSIS",
-        section_heading_style
-    ))
+        elements.extend([
+            Paragraph(
+                f"<b>Overall Performance:</b> This project came in {status} by {abs_variance_text} ({abs_variance_pct_text})",
+                BODY_STYLE
+            ),
+            Spacer(1, 0.05*inch),
+            budget_table,
+        ])
+    
+    elements.extend([
+        Spacer(1, 0.15*inch),
+        # ===== 2. CATEGORY & METRIC BREAKDOWN =====
+        Paragraph("2. CATEGORY & METRIC BREAKDOWN: VARIANCE ANALYSIS", SECTION_HEADING_STYLE),
+    ])
     
     # Category matching
-    if category_mapping:
-        match_summary = category_mapping.get('match_summary', {})
-        matched = match_summary.get('total_matched', 0)
-        estimate_only = match_summary.get('total_estimate_only', 0)
-        actual_only = match_summary.get('total_actual_only', 0)
-        match_rate = match_summary.get('match_rate_pct', 0)
-        
-        elements.append(Paragraph("<b>Category Matching (Estimate Report vs Actual Report):</b>", body_bold_style))
-        elements.append(Paragraph(f"• {matched} categories found in BOTH reports (matched exactly)", body_style))
-        elements.append(Paragraph(f"• {estimate_only} categories only in Estimate report (no actual spending recorded)", body_style))
-        
-        actual_only_cats = category_mapping.get('actual_only_categories', [])
-        if actual_only_cats:
-            cat_names = ', '.join([c['category'] for c in actual_only_cats[:3]])
-            if len(actual_only_cats) > 3:
-                cat_names += f' (+{len(actual_only_cats) - 3} more)'
-            elements.append(Paragraph(f"• {actual_only} categories only in Actual report (unbudgeted/unexpected costs: {cat_names})", body_style))
+    if rec.has_category_mapping:
+        actual_only_names = rec.actual_only_names
+        if actual_only_names:
+            cat_names = ', '.join(actual_only_names[:3])
+            if len(actual_only_names) > 3:
+                cat_names += f' (+{len(actual_only_names) - 3} more)'
+            actual_only_text = f"• {rec.actual_only} categories only in Actual report (unbudgeted/unexpected costs: {cat_names})"
         else:
-            elements.append(Paragraph(f"• {actual_only} categories only in Actual report (unbudgeted/unexpected costs)", body_style))
+            actual_only_text = f"• {rec.actual_only} categories only in Actual report (unbudgeted/unexpected costs)"
         
-        elements.append(Paragraph(f"• Match Rate: {match_rate:.0f}%", body_style))
-        elements.append(Spacer(1, 0.05*inch))
+        elements.extend([
+            Paragraph("Category Matching (Estimate Report vs Actual Report):", BODY_BOLD_STYLE),
+            Paragraph(f"• {rec.matched} categories found in BOTH reports (matched exactly)", BODY_STYLE),
+            Paragraph(f"• {rec.estimate_only} categories only in Estimate report (no actual spending recorded)", BODY_STYLE),
+            Paragraph(actual_only_text, BODY_STYLE),
+            Paragraph(f"• Match Rate: {rec.match_rate:.0f}%", BODY_STYLE),
+            Spacer(1, 0.05*inch),
+        ])
     
     # Cost breakdown table (from summary stats)
-    if summary:
-        over_budget = summary.get('over_budget_categories', 0)
-        under_budget = summary.get('under_budget_categories', 0)
+    if rec.has_summary:
+        elements.extend([
+            Paragraph("Category Breakdown:", BODY_BOLD_STYLE),
+            Paragraph(f"• {rec.over_budget} categories exceeded their budgets", BODY_STYLE),
+            Paragraph(f"• {rec.under_budget} categories came in under budget", BODY_STYLE),
+        ])
+    
+    elements.extend([
+        Spacer(1, 0.15*inch),
+        # ===== 3. ROOT CAUSE ANALYSIS =====
+        Paragraph("3. ROOT CAUSE ANALYSIS & IMPACT ON PROFITABILITY", SECTION_HEADING_STYLE),
+    ])
+    
+    if rec.has_summary:
+        elements.extend([
+            Paragraph("Major Variance Drivers:", BODY_BOLD_STYLE),
+            Spacer(1, 0.05*inch),
+        ])
         
-        elements.append(Paragraph("<b>Category Breakdown:</b>", body_bold_style))
-        elements.append(Paragraph(f"• {over_budget} categories exceeded their budgets", body_style))
-        elements.append(Paragraph(f"• {under_budget} categories came in under budget", body_style))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # ===== 3. ROOT CAUSE ANALYSIS =====
-    elements.append(Paragraph(
-        "3. ROOT CAUSE ANALYSIS & IMPACT ON PROFITABILITY",
-        section_heading_style
-    ))
-    
-    if summary:
-        biggest_overrun = summary.get('biggest_overrun', {})
-        biggest_underrun = summary.get('biggest_underrun', {})
+        if rec.overrun_amt != 0:
+            elements.extend([
+                Paragraph(
+                    f"<b>Largest Cost Overrun:</b> {rec.overrun_cat} was ${abs(rec.overrun_amt):,.2f} over budget",
+                    BODY_STYLE
+                ),
+                Paragraph(
+                    f"<b>Root Cause:</b> This category exceeded estimates, likely due to unforeseen complexities, "
+                    f"scope changes, or material/labor cost increases. Recommend detailed review of this category "
+                    f"for future project estimates.",
+                    BODY_STYLE
+                ),
+                Spacer(1, 0.05*inch),
+            ])
         
-        elements.append(Paragraph("<b>Major Variance Drivers:</b>", body_bold_style))
-        elements.append(Spacer(1, 0.05*inch))
-        
-        if biggest_overrun.get('amount', 0) != 0:
-            overrun_cat = biggest_overrun.get('category', 'Unknown')
-            overrun_amt = biggest_overrun.get('amount', 0)
-            elements.append(Paragraph(
-                f"<b>Largest Cost Overrun:</b> {overrun_cat} was ${abs(overrun_amt):,.2f} over budget",
-                body_style
-            ))
-            elements.append(Paragraph(
-                f"<b>Root Cause:</b> This category exceeded estimates, likely due to unforeseen complexities, "
-                f"scope changes, or material/labor cost increases. Recommend detailed review of this category "
-                f"for future project estimates.",
-                body_style
-            ))
-            elements.append(Spacer(1, 0.05*inch))
-        
-        if biggest_underrun.get('amount', 0) != 0:
-            underrun_cat = biggest_underrun.get('category', 'Unknown')
-            underrun_amt = biggest_underrun.get('amount', 0)
-            elements.append(Paragraph(
-                f"<b>Largest Cost Savings:</b> {underrun_cat} saved ${abs(underrun_amt):,.2f}",
-                body_style
-            ))
-            elements.append(Paragraph(
-                f"<b>Reason:</b> This category came in under budget, possibly due to efficient resource management, "
-                f"favorable market conditions, or conservative initial estimates. Consider replicating these practices.",
-                body_style
-            ))
-            elements.append(Spacer(1, 0.05*inch))
+        if rec.underrun_amt != 0:
+            elements.extend([
+                Paragraph(
+                    f"<b>Largest Cost Savings:</b> {rec.underrun_cat} saved ${abs(rec.underrun_amt):,.2f}",
+                    BODY_STYLE
+                ),
+                Paragraph(
+                    f"<b>Reason:</b> This category came in under budget, possibly due to efficient resource management, "
+                    f"favorable market conditions, or conservative initial estimates. Consider replicating these practices.",
+                    BODY_STYLE
+                ),
+                Spacer(1, 0.05*inch),
+            ])
         
         # Unbudgeted spending impacts
-        if actual_only > 0:
-            elements.append(Paragraph(
-                f"<b>Unbudgeted Spending Impacts:</b> {actual_only} unexpected cost categories added "
-                f"${abs(total_variance):,.2f} to the project. These unbudgeted items represent scope creep or "
-                f"inadequate initial planning and should be addressed in the estimation process.",
-                body_style
-            ))
-            elements.append(Spacer(1, 0.05*inch))
+        if rec.actual_only > 0:
+            elements.extend([
+                Paragraph(
+                    f"<b>Unbudgeted Spending Impacts:</b> {rec.actual_only} unexpected cost categories added "
+                    f"{abs_variance_text} to the project. These unbudgeted items represent scope creep or "
+                    f"inadequate initial planning and should be addressed in the estimation process.",
+                    BODY_STYLE
+                ),
+                Spacer(1, 0.05*inch),
+            ])
         
         # Overall profitability impact
-        elements.append(Paragraph("<b>Overall Profitability Impact:</b>", body_bold_style))
-        if total_variance > 0:
-            elements.append(Paragraph(
-                f"The total cost overrun of ${total_variance:,.2f} ({variance_pct:.1f}%) directly reduced the "
-                f"net profit margin. The primary drivers were {overrun_cat if biggest_overrun.get('amount') else 'various categories'}. "
-                f"Future projects should focus on tighter cost controls in high-variance categories.",
-                body_style
-            ))
+        if rec.total_variance > 0:
+            impact_text = (
+                f"The total cost overrun of ${rec.total_variance:,.2f} ({rec.variance_pct:.1f}%) directly reduced the "
+                f"net profit margin. The primary drivers were {rec.overrun_cat if rec.overrun_amt else 'various categories'}. "
+                f"Future projects should focus on tighter cost controls in high-variance categories."
+            )
         else:
+            impact_text = (
+                f"The project came in {abs_variance_text} ({abs_variance_pct_text}) under budget, "
+                f"improving profitability. This was primarily driven by {rec.underrun_cat if rec.underrun_amt else 'various categories'}. "
+                f"These cost-saving practices should be documented and replicated in future projects."
+            )
+        elements.extend([
+            Paragraph("Overall Profitability Impact:", BODY_BOLD_STYLE),
+            Paragraph(impact_text, BODY_STYLE),
+        ])
+    
+    elements.extend([
+        Spacer(1, 0.15*inch),
+        # ===== 4. ACTIONABLE INSIGHTS & RECOMMENDATIONS =====
+        Paragraph("4. ACTIONABLE INSIGHTS & RECOMMENDATIONS", SECTION_HEADING_STYLE),
+        Paragraph("Lessons Learned:", BODY_BOLD_STYLE),
+    ])
+    
+    if rec.has_summary:
+        if rec.total_variance > 0:
             elements.append(Paragraph(
-                f"The project came in ${abs(total_variance):,.2f} ({abs(variance_pct):.1f}%) under budget, "
-                f"improving profitability. This was primarily driven by {underrun_cat if biggest_underrun.get('amount') else 'various categories'}. "
-                f"These cost-saving practices should be documented and replicated in future projects.",
-                body_style
-            ))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # ===== 4. ACTIONABLE INSIGHTS & RECOMMENDATIONS =====
-    elements.append(Paragraph(
-        "4. ACTIONABLE INSIGHTS & RECOMMENDATIONS",
-        section_heading_style
-    ))
-    
-    elements.append(Paragraph("<b>Lessons Learned:</b>", body_bold_style))
-    
-    if summary:
-        if total_variance > 0:
-            elements.append(Paragraph(
-                f"• Cost overruns in {over_budget} categories indicate estimation challenges or scope changes",
-                body_style
-            ))
-            elements.append(Paragraph(
-                "• Future projects should include contingency buffers for high-variance categories",
-                body_style
+                f"• Cost overruns in {rec.over_budget} categories indicate estimation challenges or scope changes",
+                BODY_STYLE
             ))
+            elements.extend(_paragraphs(_CONTINGENCY_LESSON_PARSED, BODY_STYLE))
         else:
-            elements.append(Paragraph(
-                "• Cost savings demonstrate effective project management and resource allocation",
-                body_style
-            ))
-            elements.append(Paragraph(
-                "• Document successful practices for replication in future projects",
-                body_style
-            ))
+            elements.extend(_paragraphs(_UNDER_BUDGET_LESSONS_PARSED, BODY_STYLE))
         
-        if actual_only > 0:
+        if rec.actual_only > 0:
             elements.append(Paragraph(
-                f"• {actual_only} unbudgeted categories suggest gaps in initial scope definition",
-                body_style
+                f"• {rec.actual_only} unbudgeted categories suggest gaps in initial scope definition",
+                BODY_STYLE
             ))
     
-    elements.append(Spacer(1, 0.05*inch))
-    elements.append(Paragraph("<b>Recommended Actions:</b>", body_bold_style))
-    
-    elements.append(Paragraph(
-        "1. <b>Refine Future Estimates:</b> Use actual costs from this project to create more accurate "
-        "initial estimates. Focus on categories with significant variances and adjust assumptions accordingly.",
-        body_style
-    ))
-    
-    elements.append(Paragraph(
-        "2. <b>Enhance Project Management:</b> Implement more rigorous cost tracking and earned value "
-        "management (EVM) for real-time monitoring and course correction during project execution.",
-        body_style
-    ))
-    
-    elements.append(Paragraph(
-        "3. <b>Strengthen Vendor Negotiation:</b> Replicate cost-saving strategies from categories that "
-        "came in under budget. Standardize processes for negotiating bulk discounts with suppliers.",
-        body_style
-    ))
-    
-    elements.append(Paragraph(
-        "4. <b>Review Scope Management:</b> Address unbudgeted items by improving initial scope definition "
-        "and implementing formal change order processes to track and approve scope changes.",
-        body_style
-    ))
-    
-    elements.append(Spacer(1, 0.1*inch))
+    elements.extend([
+        Spacer(1, 0.05*inch),
+        Paragraph("Recommended Actions:", BODY_BOLD_STYLE),
+    ])
+    elements.extend(_paragraphs(_REC_PARSED, BODY_STYLE))
     
     # Conclusion
-    elements.append(Paragraph("<b>Conclusion:</b>", body_bold_style))
+    elements.extend([
+        Spacer(1, 0.1*inch),
+        Paragraph("Conclusion:", BODY_BOLD_STYLE),
+    ])
     
-    if summary:
-        if abs(variance_pct) < 5:
+    if rec.has_summary:
+        if abs_variance_pct < 5:
             conclusion_text = (
-                f"This project performed {status} by {abs(variance_pct):.1f}%, demonstrating strong cost control "
+                f"This project performed {status} by {abs_variance_pct_text}, demonstrating strong cost control "
                 "and accurate estimation. The variance analysis provides clear insights for maintaining this "
                 "performance level in future projects. By addressing minor variances and replicating successful "
                 "practices, management can continue to deliver projects on budget."
             )
-        elif total_variance > 0:
+        elif rec.total_variance > 0:
             conclusion_text = (
-                f"While the project exceeded the budget by {variance_pct:.1f}%, this variance analysis "
+                f"While the project exceeded the budget by {rec.variance_pct:.1f}%, this variance analysis "
                 "provides clear, actionable insights. By addressing the root causes of the unfavorable "
                 "variances and implementing the recommended actions, management can make informed adjustments "
                 "to improve the financial performance of future initiatives."
             )
         else:
             conclusion_text = (
-                f"The project came in {abs(variance_pct):.1f}% under budget, demonstrating effective cost "
+                f"The project came in {abs_variance_pct_text} under budget, demonstrating effective cost "
                 "management. This variance analysis highlights successful practices that should be documented "
                 "and replicated. Continue these approaches while remaining vigilant about scope definition "
                 "and estimation accuracy."
             )
         
-        elements.append(Paragraph(conclusion_text, body_style))
-    
-    elements.append(Spacer(1, 0.2*inch))
+        elements.append(Paragraph(conclusion_text, BODY_STYLE))
     
     # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=7,
-        textColor=colors.HexColor('#9ca3af'),
-        alignment=TA_CENTER
-    )
-    
-    elements.append(Paragraph(
-        "Powered by Estimate Insight - AI-Powered Cost Variance Analysis",
-        footer_style
-    ))
-    elements.append(Paragraph(
-        f"© {datetime.now().year} Builder's Business Partner LLC",
-        footer_style
-    ))
+    elements.append(Spacer(1, 0.2*inch))
+    elements.extend(_paragraphs(_footer_parsed(date.today().year), FOOTER_STYLE))
     
     # Build PDF
     doc.build(elements)
     
+    if out is not None:
+        return None
+    
     buffer.seek(0)
     return buffer
 
 
+def _render_pdf_bytes(project_data: Dict[str, Any]) -> bytes:
+    """Render one report to bytes (picklable result for worker processes)."""
+    return generate_project_pdf(project_data).getvalue()
+
+
+def generate_project_pdfs(projects: List[Dict[str, Any]], max_workers: int = None) -> List[BytesIO]:
+    """
+    Generate PDF reports for many projects in parallel.
+    
+    Layout is CPU-bound pure Python that holds the GIL, so reports are
+    rendered in worker processes rather than threads.
+    
+    Args:
+        projects: List of project_data dictionaries (see generate_project_pdf)
+        max_workers: Number of worker processes (defaults to the CPU count)
+    
+    Returns:
+        One BytesIO per project, in input order
+    """
+    if len(projects) <= 1:
+        return [generate_project_pdf(project_data) for project_data in projects]
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return [BytesIO(pdf) for pdf in executor.map(_render_pdf_bytes, projects)]
+
+
+def _category_names(category_mapping: Dict[str, Any], kind: str) -> List[str]:
+    """
+    Get the category names for one side of the category mapping.
+    
+    Uses the '<kind>_names' list when present and falls back to the
+    '<kind>_categories' records for mappings stored before it existed.
+    
+    Args:
+        category_mapping: Category mapping from compare_estimates
+        kind: 'estimate_only' or 'actual_only'
+    
+    Returns:
+        Category names
+    """
+    names = category_mapping.get(f'{kind}_names')
+    if names is not None:
+        return names
+    return [c['category'] for c in category_mapping.get(f'{kind}_categories', [])]
+
+
+# Anything other than letters, digits, spaces, '-' and '_' is dropped from filenames
+_FILENAME_UNSAFE_RE = re.compile(r'[^\w -]')
+
+
 def generate_pdf_filename(project_name: str) -> str:
     """
     Generate a clean filename for the PDF export.
@@ -433,8 +624,7 @@ def generate_pdf_filename(project_name: str) -> str:
         Sanitized filename
     """
     # Remove special characters and replace spaces with underscores
-    clean_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '' for c in project_name)
-    clean_name = clean_name.replace(' ', '_')
+    clean_name = _FILENAME_UNSAFE_RE.sub('', project_name).replace(' ', '_')
     
     # Truncate if too long
     if len(clean_name) > 50:
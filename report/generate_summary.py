@@ -2,25 +2,85 @@
 Report Generator: Generate narrative insights using Vertex AI Gemini.
 """
 
+import asyncio
+import hashlib
 import os
-from typing import Dict, Any
-import vertexai
+import random
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional
+import numpy as np
 
-# Try different import paths for different SDK versions
-try:
+# The Vertex AI SDK takes around a second to import, so it is loaded on first
+# use (see _generative_model_class) instead of on every cold start
+if TYPE_CHECKING:
     from vertexai.generative_models import GenerativeModel
+
+try:
+    from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted, ServiceUnavailable
+    # Transient Vertex AI errors (429 / 503 / timeouts) that are worth retrying
+    RETRYABLE_ERRORS = (ResourceExhausted, ServiceUnavailable, DeadlineExceeded)
 except ImportError:
-    try:
-        from vertexai.preview.generative_models import GenerativeModel
-    except ImportError:
-        # Fallback for older versions
-        GenerativeModel = None
+    RETRYABLE_ERRORS = ()
+
+
+GEMINI_MODEL_NAME = "gemini-1.5-pro"
+# Cheaper, faster model for small reports
+GEMINI_FAST_MODEL_NAME = "gemini-1.5-flash"
+# Reports at or under both limits go to the fast model
+FAST_MODEL_MAX_CATEGORIES = 10
+FAST_MODEL_MAX_TABLE_CHARS = 2000
+# Fast-model narratives shorter than this are regenerated with the full model
+# (the prompt asks for 300-400 words)
+MIN_NARRATIVE_WORDS = 150
+
+GENERATION_CONFIG = {
+    "temperature": 0.3,         # Lower for consistent financial analysis
+    "max_output_tokens": 2048,  # Cost control
+    "top_p": 0.8,
+    "top_k": 40,
+}
+
+# max_output_tokens grows with report size from a floor that fits the
+# 300-400 word narrative, up to GENERATION_CONFIG's cap (overridable by env)
+MIN_OUTPUT_TOKENS = 768
+MAX_OUTPUT_TOKENS_CAP = int(os.getenv("MAX_OUTPUT_TOKENS_CAP", GENERATION_CONFIG["max_output_tokens"]))
+
+# Gemini calls in flight at once for generate_insight_narratives
+MAX_CONCURRENT_NARRATIVES = 8
+
+# Retries of transient Gemini errors, with jittered exponential backoff
+MAX_GEMINI_ATTEMPTS = 4
+RETRY_MIN_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 16.0
+
+# In-process cache of generated narratives, keyed by a hash of model + prompt
+NARRATIVE_CACHE_SIZE = 256
+NARRATIVE_CACHE_TTL_SECONDS = 3600
+# Optional Firestore collection that keeps narratives across restarts and
+# instances, behind the in-process cache (unset = in-process cache only)
+NARRATIVE_CACHE_COLLECTION = os.getenv("NARRATIVE_CACHE_COLLECTION")
+NARRATIVE_PERSISTENT_TTL_SECONDS = 86400
+
+_narrative_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_narrative_cache_lock = threading.Lock()
+
+# (project_id, location) passed to the last vertexai.init()
+_vertex_config = None
+_vertex_config_lock = threading.Lock()
 
 
 def initialize_vertex_ai(project_id: str = None, location: str = "us-central1"):
     """
     Initialize Vertex AI with project credentials.
     
+    Only the first call (per project/location) does any work, so request
+    handlers can call this unconditionally.
+    
     Args:
         project_id: GCP project ID (defaults to env var GCP_PROJECT_ID)
         location: GCP region (defaults to us-central1)
@@ -31,7 +91,50 @@ def initialize_vertex_ai(project_id: str = None, location: str = "us-central1"):
     if not project_id:
         raise ValueError("GCP_PROJECT_ID must be set in environment or passed as argument")
     
-    vertexai.init(project=project_id, location=location)
+    global _vertex_config
+    if _vertex_config == (project_id, location):
+        return
+    with _vertex_config_lock:
+        if _vertex_config != (project_id, location):
+            import vertexai
+            vertexai.init(project=project_id, location=location)
+            _vertex_config = (project_id, location)
+
+
+def _get_model(model_name: str = GEMINI_MODEL_NAME) -> "GenerativeModel":
+    """
+    Get a GenerativeModel, constructing it only on first use per model name
+    and project/location.
+    
+    Must be called after initialize_vertex_ai(), since the model binds to the
+    project/location configured at construction time.
+    
+    Args:
+        model_name: Gemini model name
+    
+    Returns:
+        Cached GenerativeModel instance
+    """
+    return _get_configured_model(model_name, _vertex_config)
+
+
+@lru_cache(maxsize=8)
+def _get_configured_model(model_name: str, vertex_config: Optional[tuple]) -> "GenerativeModel":
+    """
+    Construct a GenerativeModel for one (project_id, location).
+    
+    The SDK creates the model's prediction client on first use and keeps it,
+    so caching the model reuses its gRPC channel across requests.
+    
+    Args:
+        model_name: Gemini model name
+        vertex_config: (project_id, location) from initialize_vertex_ai, or None
+                       (part of the cache key only)
+    
+    Returns:
+        GenerativeModel instance
+    """
+    return _generative_model_class()(model_name)
 
 
 def generate_insight_narrative(variance_data: str, summary_stats: Dict[str, Any], 
@@ -49,83 +152,415 @@ def generate_insight_narrative(variance_data: str, summary_stats: Dict[str, Any]
     Returns:
         String containing the narrative insight
     """
-    if GenerativeModel is None:
-        raise RuntimeError(
-            "Vertex AI Generative Models not available. "
-            "This may be due to SDK version mismatch. "
-            "Consider upgrading: pip install --upgrade google-cloud-aiplatform"
-        )
+    _require_generative_model()
     
     prompt = _build_prompt(variance_data, summary_stats, project_name, prior_summaries or [])
     
+    model_name = _select_model(variance_data, summary_stats)
+    generation_config = _generation_config(variance_data, summary_stats)
+    cache_key = _narrative_cache_key(model_name, prompt)
+    cached = _narrative_cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        model = GenerativeModel("gemini-1.5-pro")
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.3,         # Lower for consistent financial analysis
-                "max_output_tokens": 2048,  # Cost control
-                "top_p": 0.8,
-                "top_k": 40,
-            }
-        )
-        return response.text
+        narrative = _generate_with_retry(model_name, prompt, generation_config)
+        if model_name != GEMINI_MODEL_NAME and not _is_complete_narrative(narrative):
+            narrative = _generate_with_retry(GEMINI_MODEL_NAME, prompt, generation_config)
     except Exception as e:
         raise RuntimeError(f"Failed to generate insight with Gemini: {str(e)}")
+    
+    _narrative_cache_update(cache_key, narrative)
+    return narrative
 
 
-def _build_prompt(variance_data: str, summary_stats: Dict[str, Any], 
-                  project_name: str, prior_summaries: list = None) -> str:
+async def agenerate_insight_narrative(variance_data: str, summary_stats: Dict[str, Any],
+                                      project_name: str = "Unnamed Project",
+                                      prior_summaries: list = None) -> str:
     """
-    Build the prompt for Gemini based on variance data and statistics.
+    Async version of generate_insight_narrative.
+    
+    Awaits the Gemini call instead of blocking, so many narratives can be
+    generated concurrently on one event loop.
     
     Args:
-        variance_data: String representation of variance data
+        variance_data: String representation of the variance dataframe
         summary_stats: Dictionary of summary statistics
-        project_name: Name of the project
-        prior_summaries: List of similar past project insights
+        project_name: Name of the project being analyzed
+        prior_summaries: List of similar past project summaries for pattern detection
     
     Returns:
-        Formatted prompt string
+        String containing the narrative insight
     """
-    # Build historical context if available
-    historical_context = ""
-    if prior_summaries and len(prior_summaries) > 0:
-        historical_context = "\n**Historical Context - Similar Past Projects**:\n"
-        for i, past_project in enumerate(prior_summaries[:3], 1):  # Limit to 3 for token efficiency
-            proj_name = past_project.get('project_name', 'Unknown')
-            variance_pct = past_project.get('variance_summary', {}).get('total_variance_pct', 0)
-            historical_context += f"\n{i}. **{proj_name}**: {variance_pct:+.1f}% variance\n"
-            
-            # Include snippet of past narrative
-            past_narrative = past_project.get('narrative', '')
-            if past_narrative:
-                snippet = past_narrative[:300] + "..." if len(past_narrative) > 300 else past_narrative
-                historical_context += f"   Insight: {snippet}\n"
+    _require_generative_model()
+    
+    prompt = _build_prompt(variance_data, summary_stats, project_name, prior_summaries or [])
+    
+    model_name = _select_model(variance_data, summary_stats)
+    generation_config = _generation_config(variance_data, summary_stats)
+    cache_key = _narrative_cache_key(model_name, prompt)
+    cached = _narrative_cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+    
+    try:
+        narrative = await _agenerate_with_retry(model_name, prompt, generation_config)
+        if model_name != GEMINI_MODEL_NAME and not _is_complete_narrative(narrative):
+            narrative = await _agenerate_with_retry(GEMINI_MODEL_NAME, prompt, generation_config)
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate insight with Gemini: {str(e)}")
+    
+    _narrative_cache_update(cache_key, narrative)
+    return narrative
+
+
+def generate_insight_narrative_stream(variance_data: str, summary_stats: Dict[str, Any],
+                                     project_name: str = "Unnamed Project",
+                                     prior_summaries: list = None) -> Iterator[str]:
+    """
+    Streaming version of generate_insight_narrative.
+    
+    Yields text as Gemini produces it, so callers can show the first
+    paragraph long before the whole narrative is finished. The complete
+    text is cached once the stream ends.
+    
+    Args:
+        variance_data: String representation of the variance dataframe
+        summary_stats: Dictionary of summary statistics
+        project_name: Name of the project being analyzed
+        prior_summaries: List of similar past project summaries for pattern detection
+    
+    Yields:
+        Successive chunks of the narrative text
+    """
+    _require_generative_model()
+    
+    prompt = _build_prompt(variance_data, summary_stats, project_name, prior_summaries or [])
+    
+    model_name = _select_model(variance_data, summary_stats)
+    generation_config = _generation_config(variance_data, summary_stats)
+    cache_key = _narrative_cache_key(model_name, prompt)
+    cached = _narrative_cache_lookup(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    
+    chunks = []
+    try:
+        model = _get_model(model_name)
+        for attempt in range(MAX_GEMINI_ATTEMPTS):
+            try:
+                for chunk in model.generate_content(_prompt_parts(prompt), generation_config=generation_config,
+                                                    stream=True):
+                    text = chunk.text
+                    chunks.append(text)
+                    yield text
+                break
+            except RETRYABLE_ERRORS:
+                # Text already sent to the caller can't be taken back
+                if chunks or attempt == MAX_GEMINI_ATTEMPTS - 1:
+                    raise
+                time.sleep(_retry_delay(attempt))
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate insight with Gemini: {str(e)}")
+    
+    _narrative_cache_update(cache_key, "".join(chunks))
+
+
+def generate_insight_narratives(reports: List[Dict[str, Any]],
+                                max_concurrency: int = MAX_CONCURRENT_NARRATIVES) -> List[str]:
+    """
+    Generate narratives for many reports concurrently.
+    
+    Total latency tracks the slowest Gemini call rather than the sum of all.
+    At most max_concurrency calls are in flight at once, to stay inside
+    Vertex AI request quotas on large batches.
+    Must not be called from inside a running event loop (await
+    agenerate_insight_narrative directly there instead).
+    
+    Args:
+        reports: List of dicts of generate_insight_narrative keyword arguments
+                 (variance_data, summary_stats, optional project_name / prior_summaries)
+        max_concurrency: Maximum number of Gemini calls in flight
+    
+    Returns:
+        One narrative per report, in input order
+    """
+    async def _gather() -> List[str]:
+        semaphore = asyncio.Semaphore(max_concurrency)
         
-        historical_context += "\n**Pattern Detection**: Look for recurring themes across these projects.\n"
+        async def _generate(report: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await agenerate_insight_narrative(**report)
+        
+        return await asyncio.gather(*(_generate(report) for report in reports))
     
-    prompt = f"""You are writing a clear, easy-to-understand budget analysis report for a construction project. Your audience includes project managers and stakeholders who may not have deep financial expertise, so use plain English and avoid jargon.
+    return asyncio.run(_gather())
 
-**PROJECT**: {project_name}
 
-**BUDGET SUMMARY**:
-- Planned Budget: ${summary_stats['total_estimated']:,.2f}
-- Actual Spending: ${summary_stats['total_actual']:,.2f}
-- Difference: ${summary_stats['total_variance']:,.2f} ({summary_stats['total_variance_pct']:.1f}% {'over' if summary_stats['total_variance'] > 0 else 'under'} budget)
-- Items Over Budget: {summary_stats['over_budget_categories']}
-- Items Under Budget: {summary_stats['under_budget_categories']}
+def _generate_with_retry(model_name: str, prompt: str, generation_config: Dict[str, Any]) -> str:
+    """
+    Call Gemini, retrying transient errors (see RETRYABLE_ERRORS) with backoff.
+    
+    Args:
+        model_name: Gemini model name
+        prompt: Prompt text
+        generation_config: Generation settings for the call
+    
+    Returns:
+        Generated text
+    """
+    for attempt in range(MAX_GEMINI_ATTEMPTS):
+        try:
+            return _get_model(model_name).generate_content(
+                _prompt_parts(prompt), generation_config=generation_config
+            ).text
+        except RETRYABLE_ERRORS:
+            if attempt == MAX_GEMINI_ATTEMPTS - 1:
+                raise
+            time.sleep(_retry_delay(attempt))
 
-**BIGGEST CHANGES**:
-- Largest Overrun: {summary_stats['biggest_overrun']['category']} (${summary_stats['biggest_overrun']['amount']:,.2f} more than planned)
-- Largest Savings: {summary_stats['biggest_underrun']['category']} (${abs(summary_stats['biggest_underrun']['amount']):,.2f} less than planned)
 
-**ALL LINE ITEMS**:
-{variance_data}
-{historical_context}
----
+async def _agenerate_with_retry(model_name: str, prompt: str, generation_config: Dict[str, Any]) -> str:
+    """Async version of _generate_with_retry."""
+    for attempt in range(MAX_GEMINI_ATTEMPTS):
+        try:
+            response = await _get_model(model_name).generate_content_async(
+                _prompt_parts(prompt), generation_config=generation_config
+            )
+            return response.text
+        except RETRYABLE_ERRORS:
+            if attempt == MAX_GEMINI_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+
+
+def _retry_delay(attempt: int) -> float:
+    """Random delay before retrying after the given (0-based) failed attempt."""
+    ceiling = min(RETRY_MAX_DELAY_SECONDS, RETRY_MIN_DELAY_SECONDS * 2 ** (attempt + 1))
+    return random.uniform(RETRY_MIN_DELAY_SECONDS, ceiling)
+
+
+def _select_model(variance_data: str, summary_stats: Dict[str, Any]) -> str:
+    """
+    Pick the Gemini model for a report.
+    
+    Small reports (few categories off budget, short line-item table) go to
+    the fast model; everything else uses the full model.
+    
+    Args:
+        variance_data: Line-item table that goes into the prompt
+        summary_stats: Dictionary of summary statistics
+    
+    Returns:
+        Model name
+    """
+    changed_categories = summary_stats['over_budget_categories'] + summary_stats['under_budget_categories']
+    if changed_categories <= FAST_MODEL_MAX_CATEGORIES and len(variance_data) <= FAST_MODEL_MAX_TABLE_CHARS:
+        return GEMINI_FAST_MODEL_NAME
+    return GEMINI_MODEL_NAME
+
+
+def _generation_config(variance_data: str, summary_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Size the output-token cap to the report, so small reports aren't billed for long completions.
+    
+    Args:
+        variance_data: Line-item table that goes into the prompt
+        summary_stats: Dictionary of summary statistics
+    
+    Returns:
+        GENERATION_CONFIG with max_output_tokens scaled to the report
+    """
+    changed_categories = summary_stats['over_budget_categories'] + summary_stats['under_budget_categories']
+    max_tokens = min(MAX_OUTPUT_TOKENS_CAP,
+                     MIN_OUTPUT_TOKENS + 4 * changed_categories + len(variance_data) // 20)
+    return {**GENERATION_CONFIG, "max_output_tokens": max_tokens}
+
+
+def _is_complete_narrative(narrative: str) -> bool:
+    """Check that a narrative is long enough to be the full four-paragraph report."""
+    return len(narrative.split()) >= MIN_NARRATIVE_WORDS
+
+
+def _require_generative_model() -> None:
+    """Raise if the installed Vertex AI SDK has no generative models."""
+    if _generative_model_class() is None:
+        raise RuntimeError(
+            "Vertex AI Generative Models not available. "
+            "This may be due to SDK version mismatch. "
+            "Consider upgrading: pip install --upgrade google-cloud-aiplatform"
+        )
+
+
+@lru_cache(maxsize=1)
+def _generative_model_class():
+    """
+    Import GenerativeModel from the Vertex AI SDK on first use.
+    
+    Returns:
+        GenerativeModel class, or None if the installed SDK has none
+    """
+    # Try different import paths for different SDK versions
+    try:
+        from vertexai.generative_models import GenerativeModel
+    except ImportError:
+        try:
+            from vertexai.preview.generative_models import GenerativeModel
+        except ImportError:
+            # Fallback for older versions
+            GenerativeModel = None
+    return GenerativeModel
+
+
+def _narrative_cache_key(model_name: str, prompt: str) -> str:
+    """Hash the model name and fully rendered prompt into a cache key."""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _narrative_cache_lookup(key: str) -> Optional[str]:
+    """
+    Return a cached narrative if present and not expired.
+    
+    Args:
+        key: Cache key from _narrative_cache_key
+    
+    Returns:
+        Cached narrative text, or None on a miss
+    """
+    with _narrative_cache_lock:
+        entry = _narrative_cache.get(key)
+        if entry is not None:
+            stored_at, narrative = entry
+            if time.monotonic() - stored_at <= NARRATIVE_CACHE_TTL_SECONDS:
+                _narrative_cache.move_to_end(key)
+                return narrative
+            del _narrative_cache[key]
+    
+    if not NARRATIVE_CACHE_COLLECTION:
+        return None
+    try:
+        from memory.store_project_summary import get_cached_narrative
+        narrative = get_cached_narrative(key, NARRATIVE_PERSISTENT_TTL_SECONDS, NARRATIVE_CACHE_COLLECTION)
+    except Exception as e:
+        print(f"Warning: Could not read narrative cache: {str(e)}")
+        return None
+    if narrative is not None:
+        _narrative_cache_update(key, narrative, persist=False)
+    return narrative
 
-**YOUR TASK**: Write a clear 300-400 word summary that explains the budget results to non-financial readers. Use 4 paragraphs with plain English:
+
+def _narrative_cache_update(key: str, narrative: str, persist: bool = True) -> None:
+    """
+    Store a narrative, evicting the least recently used entry when full.
+    
+    Args:
+        key: Cache key from _narrative_cache_key
+        narrative: Generated narrative text
+        persist: Also write it to NARRATIVE_CACHE_COLLECTION when configured
+    """
+    with _narrative_cache_lock:
+        _narrative_cache[key] = (time.monotonic(), narrative)
+        _narrative_cache.move_to_end(key)
+        while len(_narrative_cache) > NARRATIVE_CACHE_SIZE:
+            _narrative_cache.popitem(last=False)
+    
+    if persist and NARRATIVE_CACHE_COLLECTION:
+        try:
+            from memory.store_project_summary import store_cached_narrative
+            store_cached_narrative(key, narrative, NARRATIVE_CACHE_COLLECTION)
+        except Exception as e:
+            print(f"Warning: Could not write narrative cache: {str(e)}")
+
+
+def clear_narrative_cache() -> None:
+    """Drop every in-process cached narrative (e.g. after a prompt or model change)."""
+    with _narrative_cache_lock:
+        _narrative_cache.clear()
+
+
+# Rough upper bound on prompt size; tokens are estimated as characters / 4
+MAX_PROMPT_TOKENS = 6000
+# Share of the prompt budget the line-item table may use
+VARIANCE_TABLE_MAX_TOKENS = int(MAX_PROMPT_TOKENS * 0.8)
+# Budgeted line items whose variance is below this percentage are summarized
+# on one line of the prompt instead of listed individually
+MINOR_VARIANCE_PCT = 1.0
+# Length of each prior project's narrative snippet when the budget allows
+PRIOR_SNIPPET_CHARS = 300
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4
+
+
+def format_variance_table(variance_df, max_tokens: int = VARIANCE_TABLE_MAX_TOKENS) -> str:
+    """
+    Render the variance table compactly for the Gemini prompt.
+    
+    Whole-dollar, pipe-separated rows use far fewer tokens than the padded
+    DataFrame.to_string() layout. Rows are listed largest absolute variance
+    first until max_tokens is reached; the rest are summarized on one line.
+    Budgeted items within MINOR_VARIANCE_PCT of their estimate are always
+    summarized rather than listed.
+    
+    Args:
+        variance_df: DataFrame with Category, Estimated, Actual, Variance, Variance_% columns
+        max_tokens: Approximate token budget for the table
+    
+    Returns:
+        Prompt-ready text table
+    """
+    categories = variance_df['Category'].to_numpy()
+    estimated = variance_df['Estimated'].to_numpy()
+    actual = variance_df['Actual'].to_numpy()
+    variance = variance_df['Variance'].to_numpy()
+    variance_pct = variance_df['Variance_%'].to_numpy()
+    
+    minor = (estimated != 0) & (abs(variance_pct) < MINOR_VARIANCE_PCT)
+    candidates = (~minor).nonzero()[0]
+    candidates = candidates[np.argsort(-abs(variance[candidates]), kind='stable')]
+    
+    lines = ["Category | Estimated | Actual | Variance | Variance %"]
+    # Leave room for the two summary lines
+    budget_chars = max_tokens * 4 - 2 * 120 - len(lines[0])
+    
+    listed = 0
+    for i in candidates:
+        line = f"{categories[i]} | {estimated[i]:.0f} | {actual[i]:.0f} | {variance[i]:+.0f} | {variance_pct[i]:+.1f}%"
+        budget_chars -= len(line) + 1
+        if budget_chars < 0:
+            break
+        lines.append(line)
+        listed += 1
+    
+    minor_count = int(minor.sum())
+    if minor_count:
+        lines.append(
+            f"Other items within {MINOR_VARIANCE_PCT:g}% of estimate: {minor_count} "
+            f"({estimated[minor].sum():.0f} estimated, net variance {variance[minor].sum():+.0f})"
+        )
+    
+    omitted = candidates[listed:]
+    if len(omitted):
+        lines.append(
+            f"... and {len(omitted)} smaller items "
+            f"({estimated[omitted].sum():.0f} estimated, net variance {variance[omitted].sum():+.0f})"
+        )
+    
+    return "\n".join(lines)
+
+
+# Static prompt text, shared by every request and placed ahead of the
+# project data, so each prompt starts with the same instructions
+_PROMPT_PREAMBLE = """You are writing a clear, easy-to-understand budget analysis report for a construction project. Your audience includes project managers and stakeholders who may not have deep financial expertise, so use plain English and avoid jargon.
+
+"""
+
+_PROMPT_TASK = """**YOUR TASK**: Write a clear 300-400 word summary that explains the budget results to non-financial readers. Use 4 paragraphs with plain English:
 
 **Paragraph 1 - What Happened:**
 Start with a simple, direct statement about whether the project was over or under budget and by how much. Explain what this means in practical terms - did the project cost more or less than expected?
@@ -134,7 +569,7 @@ Start with a simple, direct statement about whether the project was over or unde
 Explain the 2-3 biggest reasons for the budget difference. Use everyday language. Instead of "variance," say "went over" or "came in under." Instead of "cost drivers," say "the main reasons costs were higher/lower." Be specific about which items and how much.
 
 **Paragraph 3 - What This Tells Us:**
-{("Looking at past similar projects, what patterns do you notice? " if prior_summaries else "")}What can we learn from this? Are there specific types of costs that are consistently hard to estimate? Were there unexpected challenges? Use simple explanations like "The team may have underestimated how long X would take" or "Prices for Y were higher than expected."
+What can we learn from this? Are there specific types of costs that are consistently hard to estimate? Were there unexpected challenges? Use simple explanations like "The team may have underestimated how long X would take" or "Prices for Y were higher than expected."
 
 **Paragraph 4 - What To Do Next Time:**
 Give 3-4 specific, practical suggestions for future projects. Write these as clear actions, like "Allow an extra 10% buffer for Foundation Work" or "Get more detailed quotes from subcontractors before setting the budget." Make these recommendations feel actionable and realistic.
@@ -147,25 +582,225 @@ Give 3-4 specific, practical suggestions for future projects. Write these as cle
 - Keep sentences short and clear
 - Avoid passive voice - say "costs increased" not "an increase was experienced"
 
-Write your analysis now:
+---
+
 """
+
+_PROMPT_INSTRUCTIONS = _PROMPT_PREAMBLE + _PROMPT_TASK
+
+_PROMPT_DATA = """**PROJECT**: $project_name
+
+**BUDGET SUMMARY**:
+- Planned Budget: $total_estimated
+- Actual Spending: $total_actual
+- Difference: $total_variance ($total_variance_pct $direction budget)
+- Items Over Budget: $over_budget_categories
+- Items Under Budget: $under_budget_categories
+
+**BIGGEST CHANGES**:
+- Largest Overrun: $overrun_category ($overrun_amount more than planned)
+- Largest Savings: $underrun_category ($underrun_amount less than planned)
+
+**ALL LINE ITEMS**:
+$variance_data
+$historical_context
+${pattern_prompt}Write your analysis now:
+"""
+
+# Whole prompt, parsed once; every placeholder is filled with preformatted text
+_PROMPT_TEMPLATE = string.Template(_PROMPT_INSTRUCTIONS + _PROMPT_DATA)
+
+# Prompt tokens outside the line-item table and past-project snippets
+# (static text plus the budget summary and per-project headers)
+_PROMPT_OVERHEAD_TOKENS = _estimate_tokens(_PROMPT_INSTRUCTIONS) + 250
+
+
+def _build_prompt(variance_data: str, summary_stats: Dict[str, Any], 
+                  project_name: str, prior_summaries: list = None) -> str:
+    """
+    Build the prompt for Gemini based on variance data and statistics.
+    
+    Args:
+        variance_data: String representation of variance data
+        summary_stats: Dictionary of summary statistics
+        project_name: Name of the project
+        prior_summaries: List of similar past project insights
+    
+    Returns:
+        Formatted prompt string
+    """
+    prior_summaries = _dedupe_prior_summaries(prior_summaries, project_name)
+    
+    # Build historical context if available
+    historical_parts = []
+    if prior_summaries:
+        # Shorten past-narrative snippets when the line items leave too little of the token budget
+        spare_tokens = MAX_PROMPT_TOKENS - _PROMPT_OVERHEAD_TOKENS - _estimate_tokens(variance_data)
+        snippet_chars = max(0, min(PRIOR_SNIPPET_CHARS, spare_tokens * 4 // len(prior_summaries[:3])))
+        
+        append = historical_parts.append
+        append("\n**Historical Context - Similar Past Projects**:\n")
+        for i, past_project in enumerate(prior_summaries[:3], 1):  # Limit to 3 for token efficiency
+            get = past_project.get
+            proj_name = get('project_name', 'Unknown')
+            variance_pct = (get('variance_summary') or {}).get('total_variance_pct', 0)
+            past_narrative = get('narrative') or ''
+            append(f"\n{i}. **{proj_name}**: {variance_pct:+.1f}% variance\n")
+            
+            # Include snippet of past narrative
+            if past_narrative and snippet_chars:
+                if len(past_narrative) > snippet_chars:
+                    past_narrative = past_narrative[:snippet_chars] + "..."
+                append(f"   Insight: {past_narrative}\n")
+        
+        historical_parts.append("\n**Pattern Detection**: Look for recurring themes across these projects.\n")
+    
+    prompt = _PROMPT_TEMPLATE.substitute(
+        _format_stats(summary_stats),
+        project_name=project_name,
+        direction='over' if summary_stats['total_variance'] > 0 else 'under',
+        over_budget_categories=summary_stats['over_budget_categories'],
+        under_budget_categories=summary_stats['under_budget_categories'],
+        overrun_category=summary_stats['biggest_overrun']['category'],
+        underrun_category=summary_stats['biggest_underrun']['category'],
+        variance_data=variance_data,
+        historical_context="".join(historical_parts),
+        pattern_prompt=("In Paragraph 3, also point out the patterns you notice across the "
+                        "similar past projects above.\n\n") if prior_summaries else ""
+    )
     return prompt
 
 
+def _format_stats(summary_stats: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Format the summary figures shared by the Gemini prompt and the quick summary.
+    
+    Both texts take their numbers from here, so they always show the same values.
+    
+    Args:
+        summary_stats: Dictionary of summary statistics
+    
+    Returns:
+        Display strings keyed by the prompt template placeholders
+    """
+    return {
+        'total_estimated': f"${summary_stats['total_estimated']:,.2f}",
+        'total_actual': f"${summary_stats['total_actual']:,.2f}",
+        'total_variance': f"${summary_stats['total_variance']:,.2f}",
+        'total_variance_pct': f"{summary_stats['total_variance_pct']:.1f}%",
+        'overrun_amount': f"${abs(summary_stats['biggest_overrun']['amount']):,.2f}",
+        'underrun_amount': f"${abs(summary_stats['biggest_underrun']['amount']):,.2f}",
+    }
+
+
+def _prompt_parts(prompt: str) -> List[str]:
+    """
+    Split a prompt from _build_prompt into its static instructions and per-report text.
+    
+    The instructions (role, task and writing style) come before any project
+    data and are sent as their own leading part, identical on every call, so
+    Vertex AI's implicit prefix caching can match them across reports.
+    
+    Args:
+        prompt: Full prompt text
+    
+    Returns:
+        [static instructions, report-specific remainder]
+    """
+    return [_PROMPT_INSTRUCTIONS, prompt[len(_PROMPT_INSTRUCTIONS):]]
+
+
+def _dedupe_prior_summaries(prior_summaries: Optional[list], project_name: str) -> list:
+    """
+    Drop prior summaries that repeat an earlier narrative or describe this same project.
+    
+    Narratives are compared after lowercasing and collapsing whitespace, so
+    overlapping retrieval results don't spend prompt tokens twice.
+    
+    Args:
+        prior_summaries: Similar past project insights, best match first
+        project_name: Name of the project being analyzed
+    
+    Returns:
+        Remaining prior summaries, in their original order
+    """
+    seen = set()
+    unique = []
+    for past_project in prior_summaries or []:
+        if past_project.get('project_name') == project_name:
+            continue
+        narrative = past_project.get('narrative') or ''
+        if narrative:
+            digest = hashlib.md5(_WHITESPACE_RE.sub(' ', narrative).strip().lower().encode()).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+        unique.append(past_project)
+    return unique
+
+
 def generate_quick_summary(summary_stats: Dict[str, Any], category_mapping: Dict[str, Any] = None) -> str:
     """
     Generate a clear, readable summary without calling Gemini (for testing/fallback).
     
+    Results are memoized on the fields the summary actually uses, so repeated
+    fallbacks for the same report only format the text once.
+    
     Args:
         summary_stats: Dictionary of summary statistics
+        category_mapping: Optional category matching details from the parser
     
     Returns:
         Formatted text summary in plain English
     """
-    total_est = summary_stats['total_estimated']
-    total_act = summary_stats['total_actual']
-    variance = summary_stats['total_variance']
-    variance_pct = summary_stats['total_variance_pct']
+    formatted = _format_stats(summary_stats)
+    stats_key = (
+        formatted['total_estimated'],
+        formatted['total_actual'],
+        summary_stats['total_variance'],
+        summary_stats['total_variance_pct'],
+        summary_stats['over_budget_categories'],
+        summary_stats['under_budget_categories'],
+        summary_stats['biggest_overrun']['category'],
+        formatted['overrun_amount'],
+        summary_stats['biggest_underrun']['category'],
+        formatted['underrun_amount'],
+    )
+    
+    matching_key = None
+    if category_mapping:
+        match_summary = category_mapping.get('match_summary', {})
+        estimate_only_cats = category_mapping.get('estimate_only_categories', [])
+        actual_only_cats = category_mapping.get('actual_only_categories', [])
+        matching_key = (
+            match_summary.get('total_matched', 0),
+            match_summary.get('total_estimate_only', 0),
+            match_summary.get('total_actual_only', 0),
+            match_summary.get('match_rate_pct', 0),
+            tuple(c['category'] for c in estimate_only_cats[:3]),
+            len(estimate_only_cats),
+            tuple(c['category'] for c in actual_only_cats[:3]),
+            len(actual_only_cats),
+        )
+    
+    return _quick_summary(stats_key, matching_key)
+
+
+@lru_cache(maxsize=256)
+def _quick_summary(stats_key: tuple, matching_key: Optional[tuple]) -> str:
+    """
+    Format the quick summary from the values generate_quick_summary extracted.
+    
+    Args:
+        stats_key: Summary statistics used by the text (money figures already
+                   formatted by _format_stats), in a fixed order
+        matching_key: Category matching values, or None when there is no mapping
+    
+    Returns:
+        Formatted text summary in plain English
+    """
+    (total_est, total_act, variance, variance_pct, over_budget_categories, under_budget_categories,
+     overrun_category, overrun_amount, underrun_category, underrun_amount) = stats_key
     
     # Determine status
     if variance > 0:
@@ -180,12 +815,9 @@ def generate_quick_summary(summary_stats: Dict[str, Any], category_mapping: Dict
     
     # Build category matching section
     category_matching_text = ""
-    if category_mapping:
-        match_summary = category_mapping.get('match_summary', {})
-        matched = match_summary.get('total_matched', 0)
-        estimate_only = match_summary.get('total_estimate_only', 0)
-        actual_only = match_summary.get('total_actual_only', 0)
-        match_rate = match_summary.get('match_rate_pct', 0)
+    if matching_key:
+        (matched, estimate_only, actual_only, match_rate,
+         estimate_only_names, estimate_only_count, actual_only_names, actual_only_count) = matching_key
         
         category_matching_text = f"""
 Category Matching (Estimate Report vs Actual Report):
@@ -196,19 +828,15 @@ Category Matching (Estimate Report vs Actual Report):
 """
         
         # Add unmatched categories details if they exist
-        if estimate_only > 0:
-            estimate_only_cats = category_mapping.get('estimate_only_categories', [])
-            if estimate_only_cats:
-                category_matching_text += f"\nBudgeted but Not Spent: {', '.join([c['category'] for c in estimate_only_cats[:3]])}"
-                if len(estimate_only_cats) > 3:
-                    category_matching_text += f" (+{len(estimate_only_cats) - 3} more)"
+        if estimate_only > 0 and estimate_only_count:
+            category_matching_text += f"\nBudgeted but Not Spent: {', '.join(estimate_only_names)}"
+            if estimate_only_count > 3:
+                category_matching_text += f" (+{estimate_only_count - 3} more)"
         
-        if actual_only > 0:
-            actual_only_cats = category_mapping.get('actual_only_categories', [])
-            if actual_only_cats:
-                category_matching_text += f"\nUnbudgeted Spending: {', '.join([c['category'] for c in actual_only_cats[:3]])}"
-                if len(actual_only_cats) > 3:
-                    category_matching_text += f" (+{len(actual_only_cats) - 3} more)"
+        if actual_only > 0 and actual_only_count:
+            category_matching_text += f"\nUnbudgeted Spending: {', '.join(actual_only_names)}"
+            if actual_only_count > 3:
+                category_matching_text += f" (+{actual_only_count - 3} more)"
     
     # Build readable summary
     summary = f"""PROJECT BUDGET SUMMARY
@@ -216,17 +844,17 @@ Category Matching (Estimate Report vs Actual Report):
 Overall Performance: This project came in {status_emoji} {status} by ${abs(variance):,.2f} ({abs(variance_pct):.1f}%).
 
 Budget Overview:
-• Original Budget: ${total_est:,.2f}
-• Actual Spending: ${total_act:,.2f}
+• Original Budget: {total_est}
+• Actual Spending: {total_act}
 • Difference: ${variance:+,.2f}
 {category_matching_text}
 Category Breakdown:
-• {summary_stats['over_budget_categories']} categories exceeded their budgets
-• {summary_stats['under_budget_categories']} categories came in under budget
+• {over_budget_categories} categories exceeded their budgets
+• {under_budget_categories} categories came in under budget
 
 Key Findings:
-• Largest Cost Overrun: {summary_stats['biggest_overrun']['category']} was ${abs(summary_stats['biggest_overrun']['amount']):,.2f} over budget
-• Largest Cost Savings: {summary_stats['biggest_underrun']['category']} saved ${abs(summary_stats['biggest_underrun']['amount']):,.2f}
+• Largest Cost Overrun: {overrun_category} was {overrun_amount} over budget
+• Largest Cost Savings: {underrun_category} saved {underrun_amount}
 
 {'This project exceeded the planned budget. Review the cost overruns to identify areas for better estimation in future projects.' if variance > 0 else 'This project came in under budget, which is positive. The cost savings may indicate effective management or conservative initial estimates.'}
 """
@@ -4,91 +4,431 @@ Flask API Routes - RESTful interface for estimate analysis
 Exposes the core analysis engine via HTTP endpoints.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify
+import io
+import json
+import shutil
 import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Any, Tuple
-from werkzeug.utils import secure_filename
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    # Responses fall back to jsonify
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    # Responses are sent uncompressed
+    Compress = None
 
 # Add project root to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from parsers.compare_estimate_to_actual import (
-    load_excel,
+    ExcelSource,
     compare_estimates,
+    compare_excel_files,
     generate_summary_stats
 )
 from report.generate_summary import (
     initialize_vertex_ai,
     generate_insight_narrative,
+    format_variance_table,
+    generate_insight_narrative_stream,
     generate_quick_summary,
     generate_project_title
 )
-from memory.store_project_summary import (
-    store_project_insight,
-    retrieve_similar_projects,
-    get_project_history
-)
-from visuals.generate_chart import generate_variance_bar_chart, chart_to_base64
+
+
+# Uploads larger than this are spooled to a named temp file, which
+# save_upload() can hard-link into place instead of copying
+UPLOAD_SPOOL_MAX_MEMORY = 500 * 1024
+
+# Copy uploads to disk in 1 MiB chunks rather than Werkzeug's default 16 KiB
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadRequest(Request):
+    """Request whose file uploads keep a filesystem name (see save_upload)."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Werkzeug's default spools to an unnamed TemporaryFile, so saving an
+        # upload means writing it to disk a second time
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_MAX_MEMORY:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile('rb+')
+
+
+def save_upload(upload, path: str) -> None:
+    """
+    Save an uploaded file to path.
+    
+    Uploads spooled by UploadRequest are hard-linked (no data is copied);
+    small in-memory uploads, or a path on another filesystem, fall back to a copy.
+    
+    Args:
+        upload: Werkzeug FileStorage
+        path: Destination file path
+    """
+    name = getattr(upload.stream, 'name', None)
+    if isinstance(name, str):
+        try:
+            upload.stream.flush()
+            os.link(name, path)
+            return
+        except OSError:
+            pass
+    upload.save(path, buffer_size=UPLOAD_COPY_BUFFER_SIZE)
 
 
 def create_app():
-    """Create and configure Flask application."""
+    """
+    Create and configure Flask application.
+    
+    The Firestore client (memory.store_project_summary) and matplotlib
+    (visuals.generate_chart) are imported inside the handlers that use them,
+    so a cold start only pays for them once a request needs memory or a chart.
+    """
     app = Flask(__name__)
+    app.request_class = UploadRequest
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     
+    # Compress JSON responses over 1 KB; server-sent events are left alone so
+    # each event is delivered as soon as it is written
+    if Compress is not None:
+        app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+        app.config['COMPRESS_MIN_SIZE'] = 1024
+        app.config['COMPRESS_STREAMS'] = False
+        Compress(app)
+    
     return app
 
 
 app = create_app()
 
 
+def _json_response(payload: Dict[str, Any], status: int = 200) -> Response:
+    """
+    Serialize a (potentially large) analysis result to a JSON response.
+    
+    Uses orjson when installed, which encodes the per-category variance
+    records several times faster than jsonify; keys are sorted as jsonify does.
+    
+    Args:
+        payload: JSON-serializable response body
+        status: HTTP status code
+    
+    Returns:
+        Flask Response with mimetype application/json
+    """
+    if orjson is None:
+        response = jsonify(payload)
+        response.status_code = status
+        return response
+    
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return Response(body, status=status, mimetype='application/json')
+
+
+# Analysis jobs queued with POST /analyze?async=true, polled via GET /jobs/<job_id>.
+# A job runs in the process that queued it, but its status and result are kept
+# in Firestore, so a poll can be answered by any gunicorn worker or instance.
+JOBS_COLLECTION = os.getenv("JOBS_COLLECTION", "analysis_jobs")
+_job_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='analysis-job')
+# Jobs are reported as unknown this long after finishing (a Firestore TTL
+# policy on 'expires_at' can delete them)
+JOB_RETENTION_SECONDS = 3600
+
+
+def _job_ref(job_id: str):
+    """Firestore document holding a job's status and result."""
+    from memory.store_project_summary import initialize_firestore
+    return initialize_firestore().collection(JOBS_COLLECTION).document(job_id)
+
+
+def _run_analysis_job(job_id: str, temp_dir: str, estimate_path: str, actual_path: str,
+                      options: Dict[str, Any]) -> None:
+    """Run a queued analysis, record its result and remove its uploads."""
+    ref = _job_ref(job_id)
+    try:
+        ref.update({'status': 'running'})
+    except Exception as e:
+        print(f"Warning: Could not update job {job_id}: {str(e)}")
+    
+    try:
+        result = analyze_files(estimate_path, actual_path, **options)
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    try:
+        _finish_job(ref, result)
+    except Exception as e:
+        # e.g. a result over Firestore's 1 MiB document limit
+        print(f"Warning: Could not store result of job {job_id}: {str(e)}")
+        try:
+            _finish_job(ref, {'success': False, 'error': f"Could not store job result: {str(e)}"})
+        except Exception as e:
+            print(f"Warning: Could not update job {job_id}: {str(e)}")
+
+
+def _finish_job(ref, result: Dict[str, Any]) -> None:
+    """
+    Record a finished job's status and (zlib-compressed JSON) result.
+    
+    Args:
+        ref: Job document reference
+        result: analyze_files result
+    """
+    if orjson is not None:
+        body = orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(result, default=str).encode('utf-8')
+    
+    finished_at = datetime.now(timezone.utc)
+    ref.set({
+        'status': 'complete' if result['success'] else 'failed',
+        'result': zlib.compress(body),
+        'finished_at': finished_at,
+        'expires_at': finished_at + timedelta(seconds=JOB_RETENTION_SECONDS)
+    }, merge=True)
+
+
+def queue_analysis_job(options: Dict[str, Any]) -> str:
+    """
+    Save the current request's estimate_file / actual_file uploads and queue
+    their analysis on the job executor.
+    
+    Args:
+        options: Keyword arguments for analyze_files (project_name, save_memory, ...)
+    
+    Returns:
+        Job ID to poll with job_status()
+    """
+    # The job owns this directory and deletes it when done
+    temp_dir = tempfile.mkdtemp()
+    estimate_path, actual_path = _save_uploads(temp_dir)
+    
+    job_id = uuid.uuid4().hex
+    created_at = datetime.now(timezone.utc)
+    try:
+        _job_ref(job_id).set({
+            'status': 'queued',
+            'created_at': created_at,
+            'expires_at': created_at + timedelta(seconds=JOB_RETENTION_SECONDS)
+        })
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    _job_executor.submit(_run_analysis_job, job_id, temp_dir, estimate_path, actual_path, options)
+    return job_id
+
+
+def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Describe a queued analysis job.
+    
+    Args:
+        job_id: ID returned by queue_analysis_job
+    
+    Returns:
+        Response body with the job's status (and result once finished),
+        or None for an unknown or expired job
+    """
+    snapshot = _job_ref(job_id).get()
+    if not snapshot.exists:
+        return None
+    job = snapshot.to_dict()
+    
+    # TTL deletion can lag by hours, so expiry is checked here too
+    if job['expires_at'] < datetime.now(timezone.utc):
+        return None
+    
+    response = {'success': True, 'job_id': job_id, 'status': job['status']}
+    if job.get('result'):
+        response['result'] = json.loads(zlib.decompress(job['result']))
+    return response
+
+
+# Requests one gunicorn worker serves at once (keep in step with --threads)
+REQUEST_THREADS = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# Runs the independent steps of one analysis (memory search, chart render)
+# alongside the Excel parsing and Gemini call; two steps per request thread,
+# so a slow chart never holds up another request's memory search
+_step_executor = ThreadPoolExecutor(max_workers=2 * REQUEST_THREADS, thread_name_prefix='analysis-step')
+
+
+# Charts are rendered in worker processes so matplotlib doesn't hold this
+# process's GIL while other requests are being served. Workers start on
+# demand, up to one per request thread.
+CHART_PROCESSES = int(os.getenv("CHART_PROCESSES", str(REQUEST_THREADS)))
+# Limit on the render itself, counted once a worker picks the chart up
+CHART_RENDER_TIMEOUT_SECONDS = 10
+# Overall wait, which also covers queueing and spawning a cold worker
+CHART_WAIT_TIMEOUT_SECONDS = 60
+_chart_pool: Optional[ProcessPoolExecutor] = None
+_chart_pool_lock = threading.Lock()
+
+
+def _get_chart_pool() -> ProcessPoolExecutor:
+    """
+    Return the chart process pool, starting it on first use.
+    
+    Workers are spawned rather than forked, since this process may already be
+    running gRPC and executor threads.
+    """
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            from visuals.generate_chart import warm_up_chart_worker
+            _chart_pool = ProcessPoolExecutor(
+                max_workers=CHART_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=warm_up_chart_worker
+            )
+        return _chart_pool
+
+
+def _render_chart_base64(variance_df, project_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Render the variance bar chart in the chart process pool and return it base64-encoded.
+    
+    Args:
+        variance_df: Variance DataFrame
+        project_name: Name of the project (chart title)
+    
+    Returns:
+        Tuple of (base64 PNG, None), or (None, error message) if the chart
+        could not be generated
+    """
+    global _chart_pool
+    try:
+        from visuals.generate_chart import render_chart_base64_with_limit
+        pool = _get_chart_pool()
+        future = pool.submit(render_chart_base64_with_limit, variance_df, project_name,
+                             CHART_RENDER_TIMEOUT_SECONDS)
+        return future.result(timeout=CHART_WAIT_TIMEOUT_SECONDS), None
+    except TimeoutError as e:
+        # Render limit hit in the worker, or no worker free within the overall wait
+        message = str(e) or f"Chart was not ready within {CHART_WAIT_TIMEOUT_SECONDS}s"
+        print(f"Warning: Could not generate chart: {message}")
+        return None, message
+    except BrokenProcessPool as e:
+        # A worker died; start a fresh pool for the next chart
+        with _chart_pool_lock:
+            if _chart_pool is pool:
+                _chart_pool = None
+        print(f"Warning: Could not generate chart: {str(e)}")
+        return None, f"Could not generate chart: {str(e)}"
+    except Exception as e:
+        print(f"Warning: Could not generate chart: {str(e)}")
+        return None, f"Could not generate chart: {str(e)}"
+
+
+# Shapes for 'variance_data': a list of row objects, or {'columns': [...], 'data': [[...], ...]}
+VARIANCE_FORMATS = ('records', 'split')
+
+
+def _variance_payload(variance_df, variance_format: str = 'records'):
+    """
+    Serialize the variance DataFrame for a JSON response.
+    
+    'split' emits the column names once and one plain list per row, which
+    skips building a dict per row and encodes several times faster than
+    'records' for large workbooks.
+    
+    Args:
+        variance_df: Variance DataFrame
+        variance_format: One of VARIANCE_FORMATS
+    
+    Returns:
+        List of row dicts ('records') or a dict of columns and rows ('split')
+    """
+    if variance_format == 'split':
+        return {'columns': list(variance_df.columns), 'data': variance_df.to_numpy().tolist()}
+    return variance_df.to_dict('records')
+
+
+# Upload file extensions accepted (lowercase)
+ALLOWED_EXTENSIONS = ('.xlsx', '.xls')
+
+
 def allowed_file(filename: str) -> bool:
     """Check if uploaded file has allowed extension."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'xlsx', 'xls'}
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
 
 
-def analyze_files(estimate_path: str, actual_path: str, 
+def analyze_files(estimate_path: Optional[ExcelSource] = None,
+                  actual_path: Optional[ExcelSource] = None,
                   project_name: str = "Unnamed Project",
                   save_memory: bool = False,
                   quick_mode: bool = False,
-                  generate_chart: bool = False) -> Dict[str, Any]:
+                  generate_chart: bool = False,
+                  variance_format: str = 'records',
+                  dataframes: Optional[Tuple[Any, Any]] = None) -> Dict[str, Any]:
     """
     Core analysis logic - reusable by both CLI and API.
     
     Args:
-        estimate_path: Path to estimate Excel file
-        actual_path: Path to actual Excel file
+        estimate_path: Path to (or binary file of) the estimate Excel file
+        actual_path: Path to (or binary file of) the actual Excel file
         project_name: Name of the project
         save_memory: Whether to save to Firestore
         quick_mode: Skip Gemini and use quick summary
         generate_chart: Whether to generate and return chart visualization
+        variance_format: Shape of 'variance_data' ('records' or 'split')
+        dataframes: Already-parsed (estimate_df, actual_df), used instead of
+                    the two files (e.g. sheets split out of a combined workbook)
     
     Returns:
         Dictionary with analysis results
     """
     try:
-        # Step 1: Load Excel files
-        estimate_df = load_excel(estimate_path)
-        actual_df = load_excel(actual_path)
+        # Step 4 only needs the project name, so the similar-project search
+        # runs while the Excel files are parsed
+        memory_future = None
+        if save_memory:
+            from memory.store_project_summary import retrieve_similar_projects, store_project_insight
+            search_query = f"{project_name} budget variance analysis"
+            memory_future = _step_executor.submit(retrieve_similar_projects, search_query, limit=3)
         
-        # Step 2: Calculate variance and get category mapping
-        variance_df, category_mapping = compare_estimates(estimate_df, actual_df)
+        # Steps 1-3: Load Excel files, calculate variance and category mapping,
+        # and generate summary statistics (cached by file contents)
+        if dataframes is not None:
+            variance_df, category_mapping = compare_estimates(*dataframes)
+            summary_stats = generate_summary_stats(variance_df)
+        else:
+            variance_df, category_mapping, summary_stats = compare_excel_files(estimate_path, actual_path)
         
-        # Step 3: Generate summary statistics
-        summary_stats = generate_summary_stats(variance_df)
+        # Step 7 (optional) renders the chart while the narrative is generated
+        chart_future = None
+        if generate_chart:
+            chart_future = _step_executor.submit(_render_chart_base64, variance_df, project_name)
         
         # Step 3.5: Generate intelligent project title
         intelligent_title = generate_project_title(summary_stats, project_name)
         
         # Step 4: Retrieve similar past projects (if memory enabled)
         prior_summaries = []
-        if save_memory:
+        if memory_future is not None:
             try:
-                search_query = f"{project_name} budget variance analysis"
-                prior_summaries = retrieve_similar_projects(search_query, limit=3)
+                prior_summaries = memory_future.result()
             except Exception as e:
                 print(f"Warning: Could not retrieve memory: {str(e)}")
         
@@ -98,7 +438,7 @@ def analyze_files(estimate_path: str, actual_path: str,
         else:
             try:
                 initialize_vertex_ai()
-                variance_data_str = variance_df.to_string(index=False)
+                variance_data_str = format_variance_table(variance_df)
                 narrative = generate_insight_narrative(
                     variance_data_str,
                     summary_stats,
@@ -113,7 +453,9 @@ def analyze_files(estimate_path: str, actual_path: str,
                 print(f"Traceback:\n{traceback.format_exc()}")
                 narrative = generate_quick_summary(summary_stats, category_mapping)
         
-        # Step 6: Save to memory (optional)
+        # Step 6: Save to memory (optional) - finished before returning, so a
+        # returned memory_id always refers to a stored insight (the chart keeps
+        # rendering meanwhile)
         doc_id = None
         if save_memory:
             try:
@@ -127,23 +469,12 @@ def analyze_files(estimate_path: str, actual_path: str,
                         'category_mapping': category_mapping  # Include for PDF export
                     }
                 )
+                _invalidate_history(intelligent_title)
             except Exception as e:
                 print(f"Warning: Could not save to memory: {str(e)}")
         
-        # Step 7: Generate chart (optional)
-        chart_base64 = None
-        if generate_chart:
-            try:
-                chart_path = generate_variance_bar_chart(variance_df, project_name)
-                chart_base64 = chart_to_base64(chart_path)
-                # Clean up temp file
-                import os
-                try:
-                    os.remove(chart_path)
-                except:
-                    pass
-            except Exception as e:
-                print(f"Warning: Could not generate chart: {str(e)}")
+        # Step 7: Collect the chart (optional)
+        chart_base64, chart_error = chart_future.result() if chart_future is not None else (None, None)
         
         # Prepare response
         result = {
@@ -152,16 +483,18 @@ def analyze_files(estimate_path: str, actual_path: str,
             'intelligent_title': intelligent_title,  # Auto-generated descriptive title
             'summary': summary_stats,
             'narrative': narrative,
-            'variance_data': variance_df.to_dict('records'),
+            'variance_data': _variance_payload(variance_df, variance_format),
             'category_mapping': category_mapping,
             'pattern_detection_enabled': len(prior_summaries) > 0,
             'similar_projects_count': len(prior_summaries),
             'memory_id': doc_id
         }
         
-        # Add chart if generated
+        # Add chart if generated, or why it is missing
         if chart_base64:
             result['chart_image_base64'] = chart_base64
+        elif chart_error:
+            result['chart_error'] = chart_error
         
         return result
         
@@ -172,85 +505,289 @@ def analyze_files(estimate_path: str, actual_path: str,
         }
 
 
+# Serialized once; health checks from Cloud Run hit this on every probe
+_HEALTH_BODY = json.dumps({
+    'status': 'healthy',
+    'service': 'Estimate Insight Agent Pro',
+    'version': '2.0.0',
+    'endpoints': {
+        'POST /analyze': 'Analyze estimate vs actual files (async=true to queue a job)',
+        'GET /jobs/<job_id>': 'Status and result of a queued analysis',
+        'POST /analyze/stream': 'Analyze files, streaming the AI insight as server-sent events',
+        'GET /history/<project_name>': 'Get project history',
+        'GET /': 'Health check'
+    }
+}, sort_keys=True)
+
+
 @app.route('/', methods=['GET'])
 def health_check():
     """Health check endpoint for Cloud Run."""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'Estimate Insight Agent Pro',
-        'version': '2.0.0',
-        'endpoints': {
-            'POST /analyze': 'Analyze estimate vs actual files',
-            'GET /history/<project_name>': 'Get project history',
-            'GET /': 'Health check'
-        }
-    })
+    return Response(_HEALTH_BODY, mimetype='application/json')
 
 
-@app.route('/analyze', methods=['POST'])
-def analyze_estimates():
+# Leading bytes of .xlsx (zip container) and .xls (OLE2 compound file) workbooks
+EXCEL_SIGNATURES = (b'PK\x03\x04', b'\xd0\xcf\x11\xe0')
+
+
+def _has_excel_signature(upload) -> bool:
     """
-    Analyze estimate vs actual files.
+    Check that an upload starts like an Excel workbook, leaving the stream at 0.
     
-    Expected request:
-    - Content-Type: multipart/form-data
-    - Files: estimate_file, actual_file
-    - Form data: project_name (optional), save_memory (optional), quick (optional), generate_chart (optional)
+    Rejects mislabelled or garbage uploads before they reach the Excel parser.
     
-    Returns JSON with variance analysis, AI insight, and optional chart image (base64).
+    Args:
+        upload: Werkzeug FileStorage
+    
+    Returns:
+        True if the file begins with an xlsx or xls signature
+    """
+    head = upload.stream.read(4)
+    upload.stream.seek(0)
+    return head in EXCEL_SIGNATURES
+
+
+# Form values accepted as "true" for boolean options
+TRUTHY_FORM_VALUES = frozenset({'true', '1', 'yes', 'on'})
+
+
+def form_flag(form, name: str) -> bool:
+    """Read a boolean form option (false when absent)."""
+    return form.get(name, '').lower() in TRUTHY_FORM_VALUES
+
+
+def _validate_uploads() -> str:
+    """
+    Check the estimate_file / actual_file uploads of the current request.
+    
+    Returns:
+        Error message for a 400 response, or an empty string if both are valid
     """
-    # Validate request
     if 'estimate_file' not in request.files:
-        return jsonify({'success': False, 'error': 'Missing estimate_file'}), 400
+        return 'Missing estimate_file'
     
     if 'actual_file' not in request.files:
-        return jsonify({'success': False, 'error': 'Missing actual_file'}), 400
+        return 'Missing actual_file'
     
     estimate_file = request.files['estimate_file']
     actual_file = request.files['actual_file']
     
     # Check if files are valid
     if estimate_file.filename == '':
-        return jsonify({'success': False, 'error': 'Empty estimate filename'}), 400
+        return 'Empty estimate filename'
     
     if actual_file.filename == '':
-        return jsonify({'success': False, 'error': 'Empty actual filename'}), 400
+        return 'Empty actual filename'
     
     if not allowed_file(estimate_file.filename):
-        return jsonify({'success': False, 'error': 'Estimate file must be .xlsx or .xls'}), 400
+        return 'Estimate file must be .xlsx or .xls'
     
     if not allowed_file(actual_file.filename):
-        return jsonify({'success': False, 'error': 'Actual file must be .xlsx or .xls'}), 400
+        return 'Actual file must be .xlsx or .xls'
+    
+    if not _has_excel_signature(estimate_file):
+        return 'Estimate file is not a valid Excel workbook'
+    
+    if not _has_excel_signature(actual_file):
+        return 'Actual file is not a valid Excel workbook'
+    
+    return ''
+
+
+def _save_uploads(temp_dir: str) -> Tuple[str, str]:
+    """
+    Write the validated estimate_file / actual_file uploads into temp_dir.
+    
+    Args:
+        temp_dir: Directory to save the files in
+    
+    Returns:
+        Tuple of (estimate_path, actual_path)
+    """
+    paths = []
+    for field, name in (('estimate_file', 'estimate'), ('actual_file', 'actual')):
+        upload = request.files[field]
+        # Fixed names (the extension was validated), so the two uploads
+        # can't collide and the client's filename never reaches the filesystem
+        path = os.path.join(temp_dir, name + os.path.splitext(upload.filename)[1].lower())
+        save_upload(upload, path)
+        paths.append(path)
+    return paths[0], paths[1]
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Frame one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.route('/analyze', methods=['POST'])
+def analyze_estimates():
+    """
+    Analyze estimate vs actual files.
+    
+    Expected request:
+    - Content-Type: multipart/form-data
+    - Files: estimate_file, actual_file
+    - Form data: project_name (optional), save_memory (optional), quick (optional), generate_chart (optional),
+      async (optional)
+    
+    Returns JSON with variance analysis, AI insight, and optional chart image (base64).
+    With async=true, returns 202 with a job_id to poll at GET /jobs/<job_id> instead.
+    """
+    # Validate request
+    error = _validate_uploads()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
     
     # Get optional parameters
-    project_name = request.form.get('project_name', 'Unnamed Project')
-    save_memory = request.form.get('save_memory', 'false').lower() == 'true'
-    quick_mode = request.form.get('quick', 'false').lower() == 'true'
-    generate_chart = request.form.get('generate_chart', 'false').lower() == 'true'
-    
-    # Save uploaded files to temporary location
-    with tempfile.TemporaryDirectory() as temp_dir:
-        estimate_path = os.path.join(temp_dir, secure_filename(estimate_file.filename))
-        actual_path = os.path.join(temp_dir, secure_filename(actual_file.filename))
-        
-        estimate_file.save(estimate_path)
-        actual_file.save(actual_path)
-        
-        # Run analysis
-        result = analyze_files(
-            estimate_path,
-            actual_path,
-            project_name=project_name,
-            save_memory=save_memory,
-            quick_mode=quick_mode,
-            generate_chart=generate_chart
-        )
+    form = request.form
+    project_name = form.get('project_name', 'Unnamed Project')
+    save_memory = form_flag(form, 'save_memory')
+    quick_mode = form_flag(form, 'quick')
+    generate_chart = form_flag(form, 'generate_chart')
+    async_mode = form_flag(form, 'async')
+    variance_format = form.get('variance_format', 'records').lower()
+    if variance_format not in VARIANCE_FORMATS:
+        return jsonify({'success': False, 'error': f"variance_format must be one of: {', '.join(VARIANCE_FORMATS)}"}), 400
+    
+    options = {
+        'project_name': project_name,
+        'save_memory': save_memory,
+        'quick_mode': quick_mode,
+        'generate_chart': generate_chart,
+        'variance_format': variance_format
+    }
+    
+    if async_mode:
+        try:
+            job_id = queue_analysis_job(options)
+        except Exception as e:
+            return jsonify({'success': False, 'error': f'Could not queue analysis: {str(e)}'}), 500
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job_id}'
+        }), 202
+    
+    # Run analysis straight from the upload streams Werkzeug has already buffered
+    result = analyze_files(request.files['estimate_file'].stream, request.files['actual_file'].stream, **options)
     
     # Return appropriate status code
     if result['success']:
-        return jsonify(result), 200
+        return _json_response(result, 200)
     else:
-        return jsonify(result), 500
+        return _json_response(result, 500)
+
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_estimates_stream():
+    """
+    Analyze estimate vs actual files, streaming the AI insight as it is written.
+    
+    Expected request: same as POST /analyze (project_name optional).
+    
+    Returns a text/event-stream with one 'summary' event (variance data and
+    statistics), 'narrative' events carrying text chunks, then 'done'
+    (or 'error').
+    """
+    error = _validate_uploads()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    project_name = request.form.get('project_name', 'Unnamed Project')
+    
+    # The variance analysis is fast; do it before streaming, while the uploads are still open
+    try:
+        variance_df, category_mapping, summary_stats = compare_excel_files(
+            request.files['estimate_file'].stream, request.files['actual_file'].stream
+        )
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def events():
+        yield _sse('summary', {
+            'project_name': project_name,
+            'intelligent_title': generate_project_title(summary_stats, project_name),
+            'summary': summary_stats,
+            'variance_data': variance_df.to_dict('records'),
+            'category_mapping': category_mapping
+        })
+        
+        streamed = False
+        try:
+            initialize_vertex_ai()
+            for text in generate_insight_narrative_stream(
+                format_variance_table(variance_df),
+                summary_stats,
+                project_name
+            ):
+                streamed = True
+                yield _sse('narrative', {'text': text})
+        except Exception as e:
+            if streamed:
+                yield _sse('error', {'error': str(e)})
+                return
+            print(f"Warning: Gemini failed, using quick summary: {str(e)}")
+            yield _sse('narrative', {'text': generate_quick_summary(summary_stats, category_mapping)})
+        
+        yield _sse('done', {'success': True})
+    
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Poll a queued analysis job.
+    
+    Returns the job status ('queued', 'running', 'complete' or 'failed'),
+    plus the same result body as a synchronous /analyze once it has finished.
+    """
+    try:
+        response = job_status(job_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Could not read job status: {str(e)}'}), 500
+    if response is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job_id'}), 404
+    
+    return _json_response(response, 200)
+
+
+# Serialized GET /history responses, keyed by project name; entries are
+# dropped early when this process stores a new insight for the project
+HISTORY_CACHE_SIZE = 256
+HISTORY_CACHE_TTL_SECONDS = 30
+_history_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_history_cache_lock = threading.Lock()
+
+
+def _history_cache_lookup(project_name: str) -> Optional[bytes]:
+    """Return the cached /history body for a project, or None if missing or expired."""
+    with _history_cache_lock:
+        entry = _history_cache.get(project_name)
+        if entry is not None:
+            stored_at, body = entry
+            if time.monotonic() - stored_at <= HISTORY_CACHE_TTL_SECONDS:
+                _history_cache.move_to_end(project_name)
+                return body
+            del _history_cache[project_name]
+    return None
+
+
+def _history_cache_update(project_name: str, body: bytes) -> None:
+    """Cache a /history body, evicting the least recently used entry when full."""
+    with _history_cache_lock:
+        _history_cache[project_name] = (time.monotonic(), body)
+        _history_cache.move_to_end(project_name)
+        while len(_history_cache) > HISTORY_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+
+
+def _invalidate_history(project_name: Optional[str]) -> None:
+    """Forget the cached /history body for a project."""
+    with _history_cache_lock:
+        _history_cache.pop(project_name, None)
 
 
 @app.route('/history/<project_name>', methods=['GET'])
@@ -258,9 +795,15 @@ def get_history(project_name: str):
     """
     Retrieve historical insights for a project.
     
-    Returns list of past analyses from Firestore.
+    Returns list of past analyses from Firestore, cached for
+    HISTORY_CACHE_TTL_SECONDS.
     """
+    body = _history_cache_lookup(project_name)
+    if body is not None:
+        return Response(body, status=200, mimetype='application/json')
+    
     try:
+        from memory.store_project_summary import get_project_history
         history = get_project_history(project_name)
         
         # Convert datetime objects to strings for JSON serialization
@@ -268,12 +811,14 @@ def get_history(project_name: str):
             if 'created_at' in entry:
                 entry['created_at'] = entry['created_at'].isoformat()
         
-        return jsonify({
+        body = jsonify({
             'success': True,
             'project_name': project_name,
             'count': len(history),
             'history': history
-        }), 200
+        }).get_data()
+        _history_cache_update(project_name, body)
+        return Response(body, status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({
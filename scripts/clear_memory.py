@@ -29,6 +29,7 @@ def clear_all_projects():
     """Delete all projects from Firestore."""
     try:
         from google.cloud import firestore
+        from memory.store_project_summary import MAX_BATCH_SIZE
         
         print(f"\n{BOLD}{RED}⚠️  WARNING: This will DELETE ALL project history!{ENDC}")
         print(f"{YELLOW}This action cannot be undone.{ENDC}\n")
@@ -50,17 +51,27 @@ def clear_all_projects():
         
         db = firestore.Client(project=project_id)
         
-        # Get all documents
+        # Get all document references (bodies aren't needed to delete them)
         print(f"{BOLD}Fetching all projects...{ENDC}")
         collection_ref = db.collection('project_insights')
-        docs = collection_ref.stream()
+        doc_refs = collection_ref.list_documents(page_size=MAX_BATCH_SIZE)
         
-        # Count and delete
+        # Count and delete, committing up to MAX_BATCH_SIZE deletes per round-trip
         deleted_count = 0
-        for doc in docs:
-            print(f"  Deleting: {doc.id}")
-            doc.reference.delete()
-            deleted_count += 1
+        batch = db.batch()
+        pending = 0
+        for doc_ref in doc_refs:
+            print(f"  Deleting: {doc_ref.id}")
+            batch.delete(doc_ref)
+            pending += 1
+            if pending == MAX_BATCH_SIZE:
+                batch.commit()
+                deleted_count += pending
+                batch = db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+            deleted_count += pending
         
         print(f"\n{GREEN}{BOLD}✓ Successfully deleted {deleted_count} project(s)!{ENDC}")
         print(f"{GREEN}Memory cleared. You can start fresh.{ENDC}\n")
@@ -6,6 +6,15 @@ Create sample Excel files for testing the Estimate Insight Agent Pro.
 import pandas as pd
 from pathlib import Path
 
+try:
+    import xlsxwriter  # noqa: F401
+    # Writes cells straight to the workbook XML instead of building openpyxl objects.
+    # (constant_memory mode is not usable: pandas writes cells column by column.)
+    EXCEL_WRITER_OPTIONS = {'engine': 'xlsxwriter'}
+except ImportError:
+    # pandas falls back to openpyxl
+    EXCEL_WRITER_OPTIONS = {}
+
 # Create sample_data directory if it doesn't exist
 output_dir = Path(__file__).parent.parent / 'sample_data'
 output_dir.mkdir(exist_ok=True)
@@ -26,8 +35,10 @@ actual = pd.DataFrame({
 estimate_path = output_dir / 'estimate.xlsx'
 actual_path = output_dir / 'actual.xlsx'
 
-estimate.to_excel(estimate_path, index=False)
-actual.to_excel(actual_path, index=False)
+with pd.ExcelWriter(estimate_path, **EXCEL_WRITER_OPTIONS) as writer:
+    estimate.to_excel(writer, index=False)
+with pd.ExcelWriter(actual_path, **EXCEL_WRITER_OPTIONS) as writer:
+    actual.to_excel(writer, index=False)
 
 print("✅ Test files created successfully!")
 print(f"   📄 {estimate_path}")
@@ -24,6 +24,20 @@ import sys
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xlsxwriter  # noqa: F401
+    # Writes cells straight to the workbook XML instead of building openpyxl objects.
+    # (constant_memory mode is not usable: pandas writes cells column by column.)
+    EXCEL_WRITER_OPTIONS = {'engine': 'xlsxwriter'}
+except ImportError:
+    # pandas falls back to openpyxl
+    EXCEL_WRITER_OPTIONS = {}
+
 # Colors for terminal output
 GREEN = '\033[92m'
 RED = '\033[91m'
@@ -137,8 +151,10 @@ def generate_test_data(tmp_dir):
     estimate_path = os.path.join(tmp_dir, 'estimate.xlsx')
     actual_path = os.path.join(tmp_dir, 'actual.xlsx')
     
-    estimate.to_excel(estimate_path, index=False)
-    actual.to_excel(actual_path, index=False)
+    with pd.ExcelWriter(estimate_path, **EXCEL_WRITER_OPTIONS) as writer:
+        estimate.to_excel(writer, index=False)
+    with pd.ExcelWriter(actual_path, **EXCEL_WRITER_OPTIONS) as writer:
+        actual.to_excel(writer, index=False)
     
     print_success(f"Generated estimate.xlsx ({len(estimate)} items)")
     print_success(f"Generated actual.xlsx ({len(actual)} items)")
@@ -318,8 +334,17 @@ def save_results_to_file(response, output_dir='tmp'):
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     output_file = os.path.join(output_dir, f'test_results_{timestamp}.json')
     
-    with open(output_file, 'w') as f:
-        json.dump(response, f, indent=2)
+    # The base64 chart is hundreds of KB and unreadable; record its size instead
+    chart = response.get('chart_image_base64')
+    if chart:
+        response = {**response, 'chart_image_base64': f'<{len(chart)} base64 characters omitted>'}
+    
+    if orjson is not None:
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(response, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, 'w') as f:
+            json.dump(response, f, indent=2)
     
     print_success(f"Results saved to: {output_file}")
 
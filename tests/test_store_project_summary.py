@@ -0,0 +1,89 @@
+"""
+Tests for memory/store_project_summary.py.
+
+Run with: python -m unittest discover tests
+"""
+
+import json
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    from google.cloud import firestore  # noqa: F401
+    HAS_FIRESTORE = True
+except ImportError:
+    HAS_FIRESTORE = False
+
+try:
+    import flask  # noqa: F401
+    HAS_FLASK = True
+except ImportError:
+    HAS_FLASK = False
+
+
+def _history_doc(doc_id: str, project_name: str):
+    """A stored insight document as Firestore returns it, embedding included."""
+    from google.cloud.firestore_v1.vector import Vector
+
+    doc = mock.Mock()
+    doc.id = doc_id
+    doc.to_dict.return_value = {
+        'project_name': project_name,
+        'narrative': 'Came in 5% over budget.',
+        'variance_summary': {'total_variance_pct': 5.0},
+        'created_at': datetime(2024, 1, 1, tzinfo=timezone.utc),
+        'embedding': Vector([0.1, 0.2, 0.3]),
+        'embedding_q': b'\x01\x02\x03',
+        'embedding_scale': 0.01,
+        'embedding_dim': 3
+    }
+    return doc
+
+
+def _fake_db(docs):
+    """Firestore client whose collection queries all stream the given documents."""
+    db = mock.Mock()
+    query = db.collection.return_value
+    query.where.return_value = query
+    query.order_by.return_value = query
+    query.stream.return_value = docs
+    return db
+
+
+@unittest.skipUnless(HAS_FIRESTORE, "google-cloud-firestore not installed")
+class GetProjectHistoryTest(unittest.TestCase):
+
+    def test_history_with_vector_embedding_serializes(self):
+        from memory import store_project_summary
+
+        db = _fake_db([_history_doc('doc1', 'Kitchen Remodel')])
+        with mock.patch.object(store_project_summary, 'initialize_firestore', return_value=db):
+            history = store_project_summary.get_project_history('Kitchen Remodel')
+
+        self.assertEqual(history[0]['id'], 'doc1')
+        for field in store_project_summary.EMBEDDING_FIELDS:
+            self.assertNotIn(field, history[0])
+        json.dumps(history, default=str)
+
+    @unittest.skipUnless(HAS_FLASK, "Flask not installed")
+    def test_history_endpoint_returns_stored_projects(self):
+        from memory import store_project_summary
+        from routes.api import app
+
+        db = _fake_db([_history_doc('doc2', 'Office Fit-Out')])
+        with mock.patch.object(store_project_summary, 'initialize_firestore', return_value=db):
+            response = app.test_client().get('/history/Office Fit-Out')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['count'], 1)
+        self.assertNotIn('embedding', body['history'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
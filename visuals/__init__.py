@@ -2,7 +2,7 @@
 Visuals module - Chart generation for variance analysis
 """
 
-from .generate_chart import generate_variance_bar_chart
+from .generate_chart import generate_variance_bar_chart, generate_variance_bar_chart_base64
 
-__all__ = ['generate_variance_bar_chart']
+__all__ = ['generate_variance_bar_chart', 'generate_variance_bar_chart_base64']
 
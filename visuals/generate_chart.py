@@ -5,6 +5,11 @@ Generates visualizations for variance analysis.
 Currently supports: bar chart of variance by category.
 """
 
+import base64
+import io
+import signal
+import threading
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend for server environments
@@ -15,6 +20,20 @@ from typing import Optional
 import tempfile
 
 
+# Resolution of saved chart files vs. charts embedded in API responses
+# (150 dpi has a quarter of the pixels and is plenty on screen)
+FILE_DPI = 300
+API_DPI = 150
+
+# One figure per thread, cleared and redrawn for each chart instead of being
+# created and torn down every time
+_figures = threading.local()
+
+
+class ChartTimeoutError(TimeoutError):
+    """Raised when rendering a chart takes longer than its time limit."""
+
+
 def generate_variance_bar_chart(
     df: pd.DataFrame, 
     project_name: str,
@@ -36,6 +55,99 @@ def generate_variance_bar_chart(
         >>> chart_path = generate_variance_bar_chart(variance_df, "Q4 Budget")
         >>> print(f"Chart saved to: {chart_path}")
     """
+    fig = _draw_variance_chart(df, project_name)
+    
+    # Determine output path
+    if output_path is None:
+        # Create temp file that won't be auto-deleted
+        temp_dir = tempfile.gettempdir()
+        output_path = str(Path(temp_dir) / f"variance_chart_{project_name.replace(' ', '_')}.png")
+    
+    # Save the figure
+    fig.savefig(output_path, dpi=FILE_DPI, bbox_inches='tight')
+    
+    return output_path
+
+
+def generate_variance_bar_chart_base64(df: pd.DataFrame, project_name: str, dpi: int = API_DPI) -> str:
+    """
+    Render the variance bar chart in memory and return it base64-encoded.
+    
+    Nothing is written to disk, so concurrent requests don't share temp files.
+    
+    Args:
+        df: DataFrame with columns: Category, Estimated, Actual, Variance, Variance_%
+        project_name: Name of the project (used in chart title)
+        dpi: Output resolution
+    
+    Returns:
+        Base64 encoded PNG
+    """
+    fig = _draw_variance_chart(df, project_name)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def render_chart_base64_with_limit(df: pd.DataFrame, project_name: str, timeout_seconds: float) -> str:
+    """
+    generate_variance_bar_chart_base64 with a time limit counted from the start of rendering.
+    
+    The limit is enforced with SIGALRM, so a render that runs over is
+    interrupted and the process is free for the next chart. Where SIGALRM
+    can't be used (non-Unix, or not the main thread) the chart renders
+    without a limit. Used by the API's chart worker processes.
+    
+    Args:
+        df: DataFrame with columns: Category, Estimated, Actual, Variance, Variance_%
+        project_name: Name of the project (used in chart title)
+        timeout_seconds: Maximum render time
+    
+    Returns:
+        Base64 encoded PNG
+    
+    Raises:
+        ChartTimeoutError: If rendering took longer than timeout_seconds
+    """
+    if not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        return generate_variance_bar_chart_base64(df, project_name)
+    
+    def _on_timeout(signum, frame):
+        raise ChartTimeoutError(f"Chart rendering took longer than {timeout_seconds:g}s")
+    
+    previous = signal.signal(signal.SIGALRM, _on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout_seconds)
+    try:
+        return generate_variance_bar_chart_base64(df, project_name)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def warm_up_chart_worker() -> None:
+    """
+    Draw and render one throwaway chart so the first real chart in this
+    process doesn't pay for font cache loading and figure creation.
+    
+    Used as the initializer of the API's chart process pool.
+    """
+    df = pd.DataFrame({'Category': ['Warm-up'], 'Variance': [0.0]})
+    _draw_variance_chart(df, '').savefig(io.BytesIO(), format='png', dpi=API_DPI)
+
+
+def _draw_variance_chart(df: pd.DataFrame, project_name: str):
+    """
+    Draw the variance bar chart on this thread's (cleared) figure.
+    
+    Args:
+        df: DataFrame with columns: Category, Variance
+        project_name: Name of the project (used in chart title)
+    
+    Returns:
+        matplotlib Figure (reused by the next call on this thread, so save it
+        before drawing another chart)
+    """
     # Validate required columns
     required_cols = ['Category', 'Variance']
     missing_cols = [col for col in required_cols if col not in df.columns]
@@ -45,17 +157,26 @@ def generate_variance_bar_chart(
     # Set style
     sns.set_style("whitegrid")
     
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Sort by variance for better visualization
-    df_sorted = df.sort_values('Variance', ascending=True)
+    # Reuse this thread's figure and axis, or create them on first use
+    fig = getattr(_figures, 'fig', None)
+    if fig is None:
+        fig, ax = plt.subplots(figsize=(12, 8))
+        _figures.fig, _figures.ax = fig, ax
+    else:
+        ax = _figures.ax
+        ax.cla()  # also resets the title, formatters and legend
+    
+    # Sort by variance for better visualization (an index permutation, not a DataFrame copy)
+    values = df['Variance'].to_numpy()
+    order = np.argsort(values, kind='stable')
+    values = values[order]
+    categories = df['Category'].to_numpy()[order]
     
     # Define colors: red for over budget, green for under budget
-    colors = ['#d32f2f' if x > 0 else '#388e3c' for x in df_sorted['Variance']]
+    colors = np.where(values > 0, '#d32f2f', '#388e3c')
     
     # Create horizontal bar chart
-    bars = ax.barh(df_sorted['Category'], df_sorted['Variance'], color=colors, alpha=0.8)
+    bars = ax.barh(categories, values, color=colors, alpha=0.8)
     
     # Customize chart
     ax.set_xlabel('Variance ($)', fontsize=12, fontweight='bold')
@@ -69,16 +190,10 @@ def generate_variance_bar_chart(
     # Format x-axis with dollar signs and commas
     ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
     
-    # Add value labels on bars
-    for i, (bar, value) in enumerate(zip(bars, df_sorted['Variance'])):
-        label_x = value + (abs(df_sorted['Variance'].max()) * 0.02)
-        ha = 'left' if value > 0 else 'right'
-        if value < 0:
-            label_x = value - (abs(df_sorted['Variance'].max()) * 0.02)
-        
-        ax.text(label_x, bar.get_y() + bar.get_height()/2, 
-                f'${value:,.0f}',
-                ha=ha, va='center', fontsize=9, fontweight='bold')
+    # Add value labels just past the end of each bar (matplotlib places them
+    # left or right of the bar by its sign)
+    ax.bar_label(bars, labels=[f'${value:,.0f}' for value in values],
+                 padding=4, fontsize=9, fontweight='bold')
     
     # Add legend
     from matplotlib.patches import Patch
@@ -89,19 +204,9 @@ def generate_variance_bar_chart(
     ax.legend(handles=legend_elements, loc='lower right', fontsize=10)
     
     # Adjust layout to prevent label cutoff
-    plt.tight_layout()
-    
-    # Determine output path
-    if output_path is None:
-        # Create temp file that won't be auto-deleted
-        temp_dir = tempfile.gettempdir()
-        output_path = str(Path(temp_dir) / f"variance_chart_{project_name.replace(' ', '_')}.png")
+    fig.tight_layout()
     
-    # Save the figure
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close(fig)  # Close to free memory
-    
-    return output_path
+    return fig
 
 
 def chart_to_base64(chart_path: str) -> str:
@@ -114,8 +219,6 @@ def chart_to_base64(chart_path: str) -> str:
     Returns:
         Base64 encoded string of the image
     """
-    import base64
-    
     with open(chart_path, 'rb') as img_file:
         img_data = img_file.read()
         base64_str = base64.b64encode(img_data).decode('utf-8')
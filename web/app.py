@@ -5,41 +5,156 @@ Web UI Flask Application - User-friendly upload interface
 This serves the HTML templates and communicates with the backend API.
 """
 
+import atexit
+import json
+import logging
 import os
+import shutil
 import sys
+import threading
+import time
+import uuid
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, flash
+from typing import Any, Dict, Optional
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, send_file
 import tempfile
-from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 import pandas as pd  # For dataframe operations
 
+try:
+    from flask_compress import Compress
+except ImportError:
+    # Responses are sent uncompressed
+    Compress = None
+
+try:
+    from flask_limiter import Limiter
+    from flask_limiter.util import get_remote_address
+except ImportError:
+    # Requests are not rate limited
+    Limiter = None
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from routes.api import analyze_files
+from routes.api import UploadRequest, analyze_files, form_flag, job_status, queue_analysis_job, save_upload
+
+logger = logging.getLogger(__name__)
 
 
 def create_web_app():
     """Create and configure Flask web application."""
     app = Flask(__name__)
+    app.request_class = UploadRequest
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     
+    # One scratch directory per process for uploads, instead of a temporary
+    # directory per request; each request removes its own files
+    app.config['WORK_DIR'] = tempfile.mkdtemp(prefix='estinsight-')
+    atexit.register(shutil.rmtree, app.config['WORK_DIR'], ignore_errors=True)
+    
+    # Compress HTML and JSON responses (result pages, /analyze) over 1 KB
+    if Compress is not None:
+        app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+        app.config['COMPRESS_MIN_SIZE'] = 1024
+        Compress(app)
+    
     return app
 
 
 app = create_web_app()
 
+# Per-client limit on the routes that call Gemini or build PDFs. Counters are
+# kept per process unless RATELIMIT_STORAGE_URI points at shared storage
+# (e.g. redis://...), so each gunicorn worker allows this many on its own.
+EXPENSIVE_ROUTE_RATE_LIMIT = os.environ.get('EXPENSIVE_ROUTE_RATE_LIMIT', '10 per minute')
+
+if Limiter is not None:
+    # Cloud Run's front end appends the client address to X-Forwarded-For
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+    limiter = Limiter(
+        get_remote_address,
+        app=app,
+        storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    )
+else:
+    limiter = None
+
+
+def _rate_limited(view):
+    """Apply EXPENSIVE_ROUTE_RATE_LIMIT to a view (no-op without Flask-Limiter)."""
+    if limiter is None:
+        return view
+    return limiter.limit(EXPENSIVE_ROUTE_RATE_LIMIT)(view)
+
+
+# Upload file extensions accepted (lowercase)
+ALLOWED_EXTENSIONS = ('.xlsx', '.xls')
+
 
 def allowed_file(filename: str) -> bool:
     """Check if uploaded file has allowed extension."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'xlsx', 'xls'}
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
+
+
+# Why an estimate_file / actual_file upload was rejected:
+# (web UI flash message, /analyze API error)
+UPLOAD_ERRORS = {
+    'missing_estimate': ('Please upload an estimate file', 'Missing estimate_file'),
+    'missing_actual': ('Please upload an actual file', 'Missing actual_file'),
+    'empty_filename': ('Please select both files', 'Empty filename'),
+    'bad_extension': ('Only .xlsx and .xls files are allowed', 'Files must be .xlsx or .xls'),
+}
+
+
+def _validate_uploads() -> Optional[str]:
+    """
+    Check the estimate_file / actual_file uploads of the current request.
+    
+    Returns:
+        UPLOAD_ERRORS key describing the problem, or None if both are valid
+    """
+    if 'estimate_file' not in request.files:
+        return 'missing_estimate'
+    
+    if 'actual_file' not in request.files:
+        return 'missing_actual'
+    
+    estimate_file = request.files['estimate_file']
+    actual_file = request.files['actual_file']
+    
+    if estimate_file.filename == '' or actual_file.filename == '':
+        return 'empty_filename'
+    
+    if not allowed_file(estimate_file.filename) or not allowed_file(actual_file.filename):
+        return 'bad_extension'
+    
+    return None
+
+
+def _analyze_uploads(**options) -> Dict[str, Any]:
+    """
+    Analyze the validated estimate_file / actual_file uploads straight from
+    their request streams (no temp copies), using the same backend logic as the API.
+    
+    Args:
+        **options: Keyword arguments for analyze_files (project_name, save_memory, ...)
+    
+    Returns:
+        Dictionary with analysis results
+    """
+    return analyze_files(request.files['estimate_file'].stream, request.files['actual_file'].stream, **options)
+
+
+# Serialized once; the body never changes
+_HEALTH_BODY = json.dumps({'status': 'ok', 'message': 'Estimate Insight is running'}, sort_keys=True)
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return {'status': 'ok', 'message': 'Estimate Insight is running'}, 200
+    return Response(_HEALTH_BODY, status=200, mimetype='application/json')
 
 
 @app.route('/', methods=['GET'])
@@ -49,6 +164,7 @@ def index():
 
 
 @app.route('/submit', methods=['POST'])
+@_rate_limited
 def submit():
     """
     Handle form submission and process files.
@@ -84,60 +200,49 @@ def submit():
         
         # Save file temporarily and run analysis
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                combined_path = os.path.join(temp_dir, secure_filename(combined_file.filename))
-                combined_file.save(combined_path)
-                
-                # Parse combined file
-                from parsers.parse_combined_file import parse_combined_file
-                import traceback
-                
-                try:
-                    print(f"Parsing combined file: {combined_path}")
-                    estimate_df, actual_df, metadata = parse_combined_file(combined_path)
-                    
-                    print(f"✅ Parsed successfully!")
-                    print(f"   Estimate rows: {len(estimate_df)}")
-                    print(f"   Actual rows: {len(actual_df)}")
-                    print(f"   Metadata: {metadata}")
-                    
-                    # Save parsed dataframes to temporary Excel files
-                    estimate_temp = os.path.join(temp_dir, 'estimate_temp.xlsx')
-                    actual_temp = os.path.join(temp_dir, 'actual_temp.xlsx')
-                    
-                    estimate_df.to_excel(estimate_temp, index=False)
-                    actual_df.to_excel(actual_temp, index=False)
-                    
-                    print(f"Running analysis...")
-                    # Run analysis using the parsed files
-                    result = analyze_files(
-                        estimate_temp,
-                        actual_temp,
-                        project_name=project_name,
-                        save_memory=save_memory,
-                        quick_mode=False,  # Always use Gemini for web UI
-                        generate_chart=generate_chart
-                    )
-                    
-                    # Add metadata to result
-                    result['file_metadata'] = metadata
-                    print(f"✅ Analysis complete!")
-                    
-                except ValueError as e:
-                    print(f"ValueError during combined file parsing: {str(e)}")
-                    print(traceback.format_exc())
-                    flash(f'Combined file parsing failed: {str(e)}', 'error')
-                    return redirect(url_for('index'))
-                except Exception as e:
-                    print(f"Unexpected error during combined file processing: {str(e)}")
-                    print(traceback.format_exc())
-                    flash(f'Combined file processing error: {str(e)}', 'error')
-                    return redirect(url_for('index'))
+            from parsers.parse_combined_file import parse_combined_file
+            
+            extension = os.path.splitext(combined_file.filename)[1].lower()
+            combined_path = os.path.join(app.config['WORK_DIR'], f"{uuid.uuid4().hex}-combined{extension}")
+            save_upload(combined_file, combined_path)
+            
+            # Parse combined file
+            try:
+                logger.debug("Parsing combined file: %s", combined_path)
+                estimate_df, actual_df, metadata = parse_combined_file(combined_path)
+                logger.debug("Parsed combined file: %d estimate rows, %d actual rows, metadata %s",
+                             len(estimate_df), len(actual_df), metadata)
+            
+                # Run analysis on the parsed dataframes (no Excel round trip)
+                result = analyze_files(
+                    dataframes=(estimate_df, actual_df),
+                    project_name=project_name,
+                    save_memory=save_memory,
+                    quick_mode=False,  # Always use Gemini for web UI
+                    generate_chart=generate_chart
+                )
+            
+                # Add metadata to result
+                result['file_metadata'] = metadata
+            
+            except ValueError as e:
+                logger.exception("Combined file parsing failed")
+                flash(f'Combined file parsing failed: {str(e)}', 'error')
+                return redirect(url_for('index'))
+            except Exception as e:
+                logger.exception("Unexpected error during combined file processing")
+                flash(f'Combined file processing error: {str(e)}', 'error')
+                return redirect(url_for('index'))
+            finally:
+                os.remove(combined_path)
             
             if not result.get('success'):
                 flash(f"Analysis failed: {result.get('error', 'Unknown error')}", 'error')
                 return redirect(url_for('index'))
             
+            if save_memory:
+                _invalidate_patterns()
+            
             # Pass results to template
             return render_template('result.html', **result)
         
@@ -147,49 +252,26 @@ def submit():
     
     # Handle separate files mode (original behavior)
     else:
-        # Validate files
-        if 'estimate_file' not in request.files:
-            flash('Please upload an estimate file', 'error')
-            return redirect(url_for('index'))
-        
-        if 'actual_file' not in request.files:
-            flash('Please upload an actual file', 'error')
-            return redirect(url_for('index'))
-        
-        estimate_file = request.files['estimate_file']
-        actual_file = request.files['actual_file']
-        
-        if estimate_file.filename == '' or actual_file.filename == '':
-            flash('Please select both files', 'error')
-            return redirect(url_for('index'))
-        
-        if not allowed_file(estimate_file.filename) or not allowed_file(actual_file.filename):
-            flash('Only .xlsx and .xls files are allowed', 'error')
+        error = _validate_uploads()
+        if error:
+            flash(UPLOAD_ERRORS[error][0], 'error')
             return redirect(url_for('index'))
         
-        # Save files temporarily and run analysis
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                estimate_path = os.path.join(temp_dir, secure_filename(estimate_file.filename))
-                actual_path = os.path.join(temp_dir, secure_filename(actual_file.filename))
-                
-                estimate_file.save(estimate_path)
-                actual_file.save(actual_path)
-                
-                # Run analysis using the same backend logic as the API
-                result = analyze_files(
-                    estimate_path,
-                    actual_path,
-                    project_name=project_name,
-                    save_memory=save_memory,
-                    quick_mode=False,  # Always use Gemini for web UI
-                    generate_chart=generate_chart
-                )
+            result = _analyze_uploads(
+                project_name=project_name,
+                save_memory=save_memory,
+                quick_mode=False,  # Always use Gemini for web UI
+                generate_chart=generate_chart
+            )
             
             if not result.get('success'):
                 flash(f"Analysis failed: {result.get('error', 'Unknown error')}", 'error')
                 return redirect(url_for('index'))
             
+            if save_memory:
+                _invalidate_patterns()
+            
             # Pass results to template
             return render_template('result.html', **result)
         
@@ -198,6 +280,70 @@ def submit():
             return redirect(url_for('index'))
 
 
+# /patterns data (projects + aggregate stats), rebuilt at most this often;
+# cleared when /submit stores a new project
+PATTERNS_CACHE_TTL_SECONDS = 30
+_patterns_cache = None  # (stored_at, projects, stats)
+_patterns_cache_lock = threading.Lock()
+
+
+def _load_patterns() -> tuple:
+    """
+    Return the recent projects and their aggregate statistics, cached for
+    PATTERNS_CACHE_TTL_SECONDS.
+    
+    Returns:
+        Tuple of (projects, stats)
+    """
+    global _patterns_cache
+    with _patterns_cache_lock:
+        entry = _patterns_cache
+    if entry is not None and time.monotonic() - entry[0] <= PATTERNS_CACHE_TTL_SECONDS:
+        return entry[1], entry[2]
+    
+    from memory.store_project_summary import get_all_projects
+    
+    try:
+        projects = get_all_projects(
+            limit=50,
+            fields=['project_name', 'narrative', 'variance_summary', 'created_at']
+        )
+        cacheable = True
+    except:
+        # Function might not exist yet, return empty (and retry next time)
+        projects = []
+        cacheable = False
+    
+    # Calculate aggregate statistics in one pass
+    total_projects = len(projects)
+    total_variance = 0
+    over_budget_count = 0
+    for project in projects:
+        variance = project.get('summary', {}).get('total_variance', 0)
+        total_variance += variance
+        if variance > 0:
+            over_budget_count += 1
+    
+    stats = {
+        'total_projects': total_projects,
+        'avg_variance': total_variance / total_projects if total_projects > 0 else 0,
+        'over_budget_count': over_budget_count,
+        'under_budget_count': total_projects - over_budget_count
+    }
+    
+    if cacheable:
+        with _patterns_cache_lock:
+            _patterns_cache = (time.monotonic(), projects, stats)
+    return projects, stats
+
+
+def _invalidate_patterns() -> None:
+    """Drop the cached /patterns data."""
+    global _patterns_cache
+    with _patterns_cache_lock:
+        _patterns_cache = None
+
+
 @app.route('/patterns', methods=['GET'])
 def patterns():
     """
@@ -206,31 +352,7 @@ def patterns():
     Shows all projects with variance patterns and trends.
     """
     try:
-        from memory.store_project_summary import get_all_projects
-        
-        try:
-            projects = get_all_projects(limit=50)
-        except:
-            # Function might not exist yet, return empty
-            projects = []
-        
-        # Calculate aggregate statistics
-        if projects:
-            total_projects = len(projects)
-            avg_variance = sum(p.get('summary', {}).get('total_variance', 0) for p in projects) / total_projects if total_projects > 0 else 0
-            over_budget_count = sum(1 for p in projects if p.get('summary', {}).get('total_variance', 0) > 0)
-        else:
-            total_projects = 0
-            avg_variance = 0
-            over_budget_count = 0
-        
-        stats = {
-            'total_projects': total_projects,
-            'avg_variance': avg_variance,
-            'over_budget_count': over_budget_count,
-            'under_budget_count': total_projects - over_budget_count
-        }
-        
+        projects, stats = _load_patterns()
         return render_template('patterns.html', projects=projects, stats=stats)
     
     except Exception as e:
@@ -239,6 +361,7 @@ def patterns():
 
 
 @app.route('/export_pdf/<doc_id>', methods=['GET'])
+@_rate_limited
 def export_pdf(doc_id):
     """
     Export a project analysis as a PDF.
@@ -249,13 +372,14 @@ def export_pdf(doc_id):
     Returns:
         PDF file download
     """
+    pdf_file = None
     try:
-        from google.cloud import firestore
+        from memory.store_project_summary import initialize_firestore
+        # Imported here so ReportLab (~0.2s to import) only loads once a PDF is requested
         from report.export_pdf import generate_project_pdf, generate_pdf_filename
-        from flask import send_file
         
-        # Initialize Firestore
-        db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+        # Shared Firestore client (created once per process)
+        db = initialize_firestore()
         
         # Retrieve project data
         doc_ref = db.collection('project_insights').document(doc_id)
@@ -276,8 +400,12 @@ def export_pdf(doc_id):
         if 'variance_summary' in project_data and 'summary' not in project_data:
             project_data['summary'] = project_data['variance_summary']
         
-        # Generate PDF
-        pdf_buffer = generate_project_pdf(project_data)
+        # Generate PDF into an anonymous temp file, so the response is served
+        # from disk (sendfile under gunicorn) rather than held in memory; the
+        # file disappears once send_file closes it
+        pdf_file = tempfile.TemporaryFile(suffix='.pdf')
+        generate_project_pdf(project_data, out=pdf_file)
+        pdf_file.seek(0)
         
         # Generate filename
         project_name = project_data.get('project_name', 'Project')
@@ -285,18 +413,22 @@ def export_pdf(doc_id):
         
         # Send PDF
         return send_file(
-            pdf_buffer,
+            pdf_file,
             mimetype='application/pdf',
             as_attachment=True,
             download_name=filename
         )
     
     except Exception as e:
+        # send_file owns (and closes) the temp file only once it has returned
+        if pdf_file is not None:
+            pdf_file.close()
         flash(f'Failed to generate PDF: {str(e)}', 'error')
         return redirect(url_for('patterns'))
 
 
 @app.route('/analyze', methods=['POST'])
+@_rate_limited
 def analyze_api():
     """
     API endpoint for programmatic analysis (same as routes/api.py).
@@ -304,53 +436,45 @@ def analyze_api():
     Expected request:
     - Content-Type: multipart/form-data
     - Files: estimate_file, actual_file
-    - Form data: project_name, save_memory, quick, generate_chart
+    - Form data: project_name, save_memory, quick, generate_chart, async
     
     Returns JSON with variance analysis, AI insight, and optional chart.
+    With async=true, returns 202 with a job_id to poll at GET /jobs/<job_id> instead.
     """
-    from flask import jsonify
     
     # Validate request
-    if 'estimate_file' not in request.files:
-        return jsonify({'success': False, 'error': 'Missing estimate_file'}), 400
-    
-    if 'actual_file' not in request.files:
-        return jsonify({'success': False, 'error': 'Missing actual_file'}), 400
-    
-    estimate_file = request.files['estimate_file']
-    actual_file = request.files['actual_file']
-    
-    # Check if files are valid
-    if estimate_file.filename == '' or actual_file.filename == '':
-        return jsonify({'success': False, 'error': 'Empty filename'}), 400
-    
-    if not allowed_file(estimate_file.filename) or not allowed_file(actual_file.filename):
-        return jsonify({'success': False, 'error': 'Files must be .xlsx or .xls'}), 400
+    error = _validate_uploads()
+    if error:
+        return jsonify({'success': False, 'error': UPLOAD_ERRORS[error][1]}), 400
     
     # Get parameters
-    project_name = request.form.get('project_name', 'Unnamed Project')
-    save_memory = request.form.get('save_memory', '').lower() in ['true', '1', 'yes']
-    quick_mode = request.form.get('quick', '').lower() in ['true', '1', 'yes']
-    generate_chart = request.form.get('generate_chart', '').lower() in ['true', '1', 'yes']
+    form = request.form
+    project_name = form.get('project_name', 'Unnamed Project')
+    save_memory = form_flag(form, 'save_memory')
+    quick_mode = form_flag(form, 'quick')
+    generate_chart = form_flag(form, 'generate_chart')
     
-    # Process files
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            estimate_path = os.path.join(temp_dir, secure_filename(estimate_file.filename))
-            actual_path = os.path.join(temp_dir, secure_filename(actual_file.filename))
-            
-            estimate_file.save(estimate_path)
-            actual_file.save(actual_path)
-            
-            # Run analysis
-            result = analyze_files(
-                estimate_path,
-                actual_path,
-                project_name=project_name,
-                save_memory=save_memory,
-                quick_mode=quick_mode,
-                generate_chart=generate_chart
-            )
+        if form_flag(form, 'async'):
+            job_id = queue_analysis_job({
+                'project_name': project_name,
+                'save_memory': save_memory,
+                'quick_mode': quick_mode,
+                'generate_chart': generate_chart
+            })
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/jobs/{job_id}'
+            }), 202
+        
+        result = _analyze_uploads(
+            project_name=project_name,
+            save_memory=save_memory,
+            quick_mode=quick_mode,
+            generate_chart=generate_chart
+        )
         
         return jsonify(result), 200 if result.get('success') else 500
     
@@ -361,6 +485,28 @@ def analyze_api():
         }), 500
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Poll an analysis queued with POST /analyze (async=true).
+    
+    Job status lives in Firestore (see routes.api.JOBS_COLLECTION), so any
+    gunicorn worker or instance can answer.
+    """
+    try:
+        response = job_status(job_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Could not read job status: {str(e)}'}), 500
+    if response is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job_id'}), 404
+    
+    return jsonify(response), 200
+
+
+# Accepted values of a feedback payload's "rating"
+FEEDBACK_RATINGS = frozenset({'thumbs_up', 'thumbs_down'})
+
+
 @app.route('/submit_feedback', methods=['POST'])
 def submit_feedback():
     """
@@ -377,13 +523,12 @@ def submit_feedback():
     
     Returns JSON with success status.
     """
-    from flask import jsonify
     from memory.store_feedback import store_insight_feedback
     
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
-        if not data:
+        if not data or not isinstance(data, dict):
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
         # Validate required fields
@@ -397,16 +542,29 @@ def submit_feedback():
                 'error': 'Missing required fields: insight_id, feedback_type, rating'
             }), 400
         
+        # Non-string values (lists, dicts, numbers) would fail the checks below
+        # or the Firestore write with a 500 instead of a clear 400
+        if not all(isinstance(value, str) for value in (insight_id, feedback_type, rating)):
+            return jsonify({
+                'success': False,
+                'error': 'insight_id, feedback_type and rating must be strings'
+            }), 400
+        
         # Validate rating value
-        if rating not in ['thumbs_up', 'thumbs_down']:
+        if rating not in FEEDBACK_RATINGS:
             return jsonify({
                 'success': False,
                 'error': 'Invalid rating. Must be thumbs_up or thumbs_down'
             }), 400
         
         # Store feedback
-        feedback_text = data.get('feedback_text', '')
-        metadata = data.get('metadata', {})
+        feedback_text = data.get('feedback_text') or ''
+        metadata = data.get('metadata') or {}
+        if not isinstance(feedback_text, str) or not isinstance(metadata, dict):
+            return jsonify({
+                'success': False,
+                'error': 'feedback_text must be a string and metadata an object'
+            }), 400
         
         feedback_id = store_insight_feedback(
             insight_id=insight_id,
@@ -440,7 +598,6 @@ def feedback_stats():
     
     Returns JSON with feedback statistics.
     """
-    from flask import jsonify
     from memory.store_feedback import get_feedback_statistics
     
     try: